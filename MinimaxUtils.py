@@ -9,9 +9,26 @@ ROWS = 6
 COLS = 7
 WINDOW_LENGTH = 4
 
+
 class MinimaxUtils:
+    center_weight = 6  # per AI piece in the centre column
+
     def __init__(self):
-        pass
+        self._window_score_tables = {}
+        self._window_score_arrays = {}  # the same tables as NumPy arrays, for evaluate_batch
+        # evaluate_window(AI) - evaluate_window(PLAYER) for every window of 4, indexed by its base-3 code
+        self.window_scores = self.window_score_table(WINDOW_LENGTH)
+
+    def window_score_table(self, connect):
+        """evaluate_window(AI) - evaluate_window(PLAYER) for every window of connect cells, by base-3 code"""
+        table = self._window_score_tables.get(connect)
+        if table is None:
+            table = [0] * 3 ** connect
+            for code in range(3 ** connect):
+                window = [code // 3 ** i % 3 for i in range(connect)]
+                table[code] = self.evaluate_window(window, AI, PLAYER) - self.evaluate_window(window, PLAYER, AI)
+            self._window_score_tables[connect] = table
+        return table
 
     def is_terminal(self, board, depth):
         return depth == 0 or board.is_full()
@@ -22,50 +39,94 @@ class MinimaxUtils:
         Positive = Good for AI (maximizer)
         Negative = Good for Human (minimizer)
         """
-        score = 0
+        geometry = board.geometry
+        cells = board.board
 
         # Score center column higher (strategic advantage)
-        center_col = COLS // 2
-        center_count = sum(1 for r in range(ROWS) if board.board[r][center_col] == AI)
-        score += center_count * 6
-
-        # Score all windows
-        score += self.score_position(board, AI)      # AI's opportunities (positive)
-        score -= self.score_position(board, PLAYER)  # Human's opportunities (negative)
-        
+        center_col = geometry.center_col
+        score = sum(1 for r in range(geometry.rows) if cells[r][center_col] == AI) * self.center_weight
+
+        # Score all windows: AI's opportunities minus the human's, looked up by window code
+        # (the same as score_position(AI) - score_position(PLAYER))
+        window_scores = self.window_score_table(geometry.connect)
+        if geometry.connect == 4:
+            for (r0, c0), (r1, c1), (r2, c2), (r3, c3) in geometry.windows:
+                score += window_scores[cells[r0][c0] + 3 * cells[r1][c1] + 9 * cells[r2][c2] + 27 * cells[r3][c3]]
+        else:
+            for window in geometry.windows:
+                code = 0
+                for r, c in reversed(window):
+                    code = code * 3 + cells[r][c]
+                score += window_scores[code]
+
         return score
 
+    @property
+    def batch_exact(self):
+        """True when evaluate_batch and move_deltas reproduce evaluate_board (it is not overridden)"""
+        return type(self).evaluate_board is MinimaxUtils.evaluate_board
+
+    def evaluate_batch(self, boards, connect=WINDOW_LENGTH):
+        """
+        evaluate_board for many boards at once, vectorised with NumPy (see batch_eval), with this
+        instance's centre weight and window score table. A class that overrides evaluate_board
+        is scored one Board at a time instead.
+        """
+        import numpy as np
+        from batch_eval import evaluate_batch
+        if not self.batch_exact:
+            if isinstance(boards, np.ndarray):
+                raise ValueError(f"{type(self).__name__} overrides evaluate_board and needs Board objects")
+            return np.array([self.evaluate_board(board) for board in boards])
+        table = self._window_score_arrays.get(connect)
+        if table is None:
+            table = self._window_score_arrays[connect] = np.array(self.window_score_table(connect), dtype=np.int64)
+        return evaluate_batch(boards, center_weight=self.center_weight, connect=connect, table=table)
+
+    def move_deltas(self, board, piece):
+        """
+        {col: change of evaluate_board if piece dropped into col} for every valid column.
+        Only the windows through each landing cell are looked at; the board is not modified.
+        """
+        geometry = board.geometry
+        cells = board.board
+        heights = board.column_heights
+        window_scores = self.window_score_table(geometry.connect)
+        windows_through = geometry.windows_through
+        rows = geometry.rows
+        center_col = geometry.center_col
+        center_delta = self.center_weight if piece == AI else 0
+        deltas = {}
+        for col in range(geometry.cols):
+            row = heights[col]
+            if row >= rows:
+                continue
+            delta = center_delta if col == center_col else 0
+            if geometry.connect == 4:
+                for window, index in windows_through[row][col]:
+                    (r0, c0), (r1, c1), (r2, c2), (r3, c3) = window
+                    code = cells[r0][c0] + 3 * cells[r1][c1] + 9 * cells[r2][c2] + 27 * cells[r3][c3]
+                    delta += window_scores[code + piece * 3 ** index] - window_scores[code]
+            else:
+                for window, index in windows_through[row][col]:
+                    code = 0
+                    for r, c in reversed(window):
+                        code = code * 3 + cells[r][c]
+                    delta += window_scores[code + piece * 3 ** index] - window_scores[code]
+            deltas[col] = delta
+        return deltas
+
     def score_position(self, board, piece):
         """
-        Score all possible windows of 4 pieces FOR the given piece.
+        Score all possible windows of connect pieces FOR the given piece.
         Returns POSITIVE values for that piece's advantages.
         """
         score = 0
         opp_piece = PLAYER if piece == AI else AI
 
-        # Horizontal
-        for r in range(ROWS):
-            for c in range(COLS - 3):
-                window = [board.board[r][c + i] for i in range(WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece, opp_piece)
-
-        # Vertical
-        for r in range(ROWS - 3):
-            for c in range(COLS):
-                window = [board.board[r + i][c] for i in range(WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece, opp_piece)
-
-        # Diagonal down-right
-        for r in range(ROWS - 3):
-            for c in range(COLS - 3):
-                window = [board.board[r + i][c + i] for i in range(WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece, opp_piece)
-
-        # Diagonal down-left
-        for r in range(ROWS - 3):
-            for c in range(3, COLS):
-                window = [board.board[r + i][c - i] for i in range(WINDOW_LENGTH)]
-                score += self.evaluate_window(window, piece, opp_piece)
+        # Horizontal, vertical, diagonal down-right and diagonal down-left windows
+        for window in board.geometry.windows:
+            score += self.evaluate_window([board.board[r][c] for r, c in window], piece, opp_piece)
 
         return score
 
@@ -76,47 +137,45 @@ class MinimaxUtils:
         piece_count = window.count(piece)
         opp_count = window.count(opp_piece)
         empty_count = window.count(EMPTY)
+        length = len(window)  # connect length of the board (4 on the standard board)
 
         # Our piece's opportunities (POSITIVE)
-        if piece_count == 4:
+        if piece_count == length:
             score += 100000  # Four in a row - winning position
-        elif piece_count == 3 and empty_count == 1:
+        elif piece_count == length - 1 and empty_count == 1:
             score += 100     # Three in a row with space - strong threat
-        elif piece_count == 2 and empty_count == 2:
+        elif piece_count == length - 2 and empty_count == 2:
             score += 10      # Two in a row with space - developing
-        elif piece_count == 1 and empty_count == 3:
+        elif piece_count == length - 3 and empty_count == 3:
             score += 1       # One piece with space - potential
 
         # Opponent's threats (NEGATIVE for us)
-        if opp_count == 3 and empty_count == 1:
+        if opp_count == length - 1 and empty_count == 1:
             score -= 90      # Opponent about to win - VERY BAD for us!
-        elif opp_count == 2 and empty_count == 2:
+        elif opp_count == length - 2 and empty_count == 2:
             score -= 5       # Opponent developing - somewhat bad
 
         return score
 
     def check_win(self, board, piece):
         """Check if the given piece has won"""
-        # Horizontal
-        for r in range(ROWS):
-            for c in range(COLS - 3):
-                if all(board.board[r][c + i] == piece for i in range(WINDOW_LENGTH)):
-                    return True
-        # Vertical
-        for r in range(ROWS - 3):
-            for c in range(COLS):
-                if all(board.board[r + i][c] == piece for i in range(WINDOW_LENGTH)):
-                    return True
-        # Diagonal down-right
-        for r in range(ROWS - 3):
-            for c in range(COLS - 3):
-                if all(board.board[r + i][c + i] == piece for i in range(WINDOW_LENGTH)):
-                    return True
-        # Diagonal down-left
-        for r in range(ROWS - 3):
-            for c in range(3, COLS):
-                if all(board.board[r + i][c - i] == piece for i in range(WINDOW_LENGTH)):
-                    return True
+        cells = board.board
+        for window in board.geometry.windows:
+            if all(cells[r][c] == piece for r, c in window):
+                return True
         return False
 
+    def count_fours(self, board, piece):
+        """Count every window of 4 fully owned by the given piece (the game's scoring rule)"""
+        cells = board.board
+        return sum(1 for window in board.geometry.windows if all(cells[r][c] == piece for r, c in window))
 
+    def count_fours_through(self, board, row, col, piece):
+        """
+        Count the windows of 4 through (row, col) fully owned by piece.
+        After dropping a piece at (row, col) this is exactly how much
+        count_fours grows, so scores can be kept up to date incrementally.
+        """
+        cells = board.board
+        return sum(1 for window, _ in board.geometry.windows_through[row][col]
+                   if all(cells[r][c] == piece for r, c in window))
@@ -104,7 +104,7 @@ def _minimax_alpha_beta_recursive(board, depth, alpha, beta, maximizing_player,
             print_tree(node)
         
         return min_eval, best_col, node
-def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent_level=0, col_played=None):
+def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent_level=0, col_played=None, stats=None):
     indent = "  " * indent_level
     
     if indent_level == 0:
@@ -120,10 +120,13 @@ def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent
     if indent_level <= 6:
         print_board_state(board, indent + "│  ")
     
-    valid_moves = board.get_valid_moves()
+    if stats is not None:
+        stats.record_node(indent_level)
+    
+    valid_moves = stats.valid_moves(board) if stats is not None else board.get_valid_moves()
     
     if depth == 0 or not valid_moves:
-        score = utils.evaluate_board(board)
+        score = stats.evaluate(utils, board) if stats is not None else utils.evaluate_board(board)
         print(f"{indent}└─ LEAF: Score = {score:.2f}")
         return score, None, 0
     
@@ -143,7 +146,7 @@ def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent
             temp_board.drop_piece(col, AI)
             
             eval_score, _, child_nodes = alpha_beta_with_tree(
-                temp_board, depth - 1, alpha, beta, False, utils, indent_level + 1, col
+                temp_board, depth - 1, alpha, beta, False, utils, indent_level + 1, col, stats
             )
             nodes_explored += child_nodes
             
@@ -156,6 +159,8 @@ def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent
             alpha = max(alpha, eval_score)
             
             if beta <= alpha:
+                if stats is not None:
+                    stats.record_cutoff(i)
                 print(f"{indent}│  ✂️ PRUNED! (β={beta:.2f} ≤ α={alpha:.2f})")
                 print(f"{indent}│  Skipping remaining {len(valid_moves) - i - 1} branches")
                 break
@@ -177,7 +182,7 @@ def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent
             temp_board.drop_piece(col, PLAYER)
             
             eval_score, _, child_nodes = alpha_beta_with_tree(
-                temp_board, depth - 1, alpha, beta, True, utils, indent_level + 1, col
+                temp_board, depth - 1, alpha, beta, True, utils, indent_level + 1, col, stats
             )
             nodes_explored += child_nodes
             
@@ -190,6 +195,8 @@ def alpha_beta_with_tree(board, depth, alpha, beta, is_maximizing, utils, indent
             beta = min(beta, eval_score)
             
             if beta <= alpha:
+                if stats is not None:
+                    stats.record_cutoff(i)
                 print(f"{indent}│  ✂️ PRUNED! (β={beta:.2f} ≤ α={alpha:.2f})")
                 print(f"{indent}│  Skipping remaining {len(valid_moves) - i - 1} branches")
                 break
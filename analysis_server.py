@@ -0,0 +1,314 @@
+"""
+Local analysis server: one pool of engine processes shared by every tool on the machine.
+
+    python analysis_server.py --port 8765 --workers 4
+
+    GET  /analyse?moves=3343&algorithm=alpha_beta&depth=6
+    GET  /analyse?moves=3343&algorithm=expectiminimax&movetime=2
+    POST /analyse    {"moves": "3343", "algorithm": "mcts", "movetime": 1.5}
+    GET  /stats
+
+Optional fields: evaluation, and rows / cols / connect for other board sizes (at most
+MAX_ROWS x MAX_COLS). The server refuses depths above --max-depth and movetimes above
+--max-movetime seconds.
+The answer is newline-delimited JSON streamed while the search runs: an
+{"type": "info", ...} line per completed iteration (SearchResult.to_dict; a depth-only
+request is searched at depths 1, 2, ... depth) and a final {"type": "result", ...} line,
+or {"type": "error", "error": ...}.
+
+Identical requests arriving while one is being searched are attached to it (they get
+the updates so far replayed, then the rest live) instead of starting a second search,
+and finished analyses are kept in a bounded LRU cache, so a repeat is answered at once
+(its result line has "cached": true). The server only listens on localhost.
+
+    for update in stream_analysis("http://127.0.0.1:8765", moves="3343", depth=6):
+        print(update)
+"""
+from engine import Engine, ALGORITHMS, EVALUATORS, board_from_moves
+from geometry import DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+from urllib.request import urlopen
+from collections import OrderedDict
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import threading
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 1024  # finished analyses kept
+WORKER_EVAL_CACHE = 1 << 16  # eval cache entries of each worker engine
+MAX_DEPTH = 10  # deepest search a request may ask for
+MAX_MOVETIME = 60.0  # longest search (seconds) a request may ask for
+MAX_ROWS = 16  # largest board a request may ask for
+MAX_COLS = 16
+
+
+def parse_request(fields, max_depth=MAX_DEPTH, max_movetime=MAX_MOVETIME, max_rows=MAX_ROWS, max_cols=MAX_COLS):
+    """Validated analysis request (a hashable tuple) from query / JSON fields; ValueError if invalid"""
+    moves = fields.get("moves", "")
+    if isinstance(moves, list):
+        moves = "".join(str(col) for col in moves)
+    algorithm = fields.get("algorithm", "alpha_beta")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    evaluation = fields.get("evaluation", "default")
+    if evaluation not in EVALUATORS:
+        raise ValueError(f"Unknown evaluation: {evaluation}")
+    movetime = float(fields["movetime"]) if fields.get("movetime") is not None else None
+    if movetime is not None and not (math.isfinite(movetime) and movetime > 0):
+        raise ValueError("movetime must be a positive number")
+    if movetime is not None and movetime > max_movetime:
+        raise ValueError(f"movetime must be at most {max_movetime:g} seconds")
+    depth = int(fields["depth"]) if fields.get("depth") is not None else (None if movetime is not None else 4)
+    if depth is not None and depth < 1:
+        raise ValueError("depth must be at least 1")
+    if depth is not None and depth > max_depth:
+        raise ValueError(f"depth must be at most {max_depth}")
+    geometry = tuple(int(fields.get(name, default))
+                     for name, default in (("rows", DEFAULT_ROWS), ("cols", DEFAULT_COLS), ("connect", DEFAULT_CONNECT)))
+    rows, cols, connect = geometry
+    if not 1 <= rows <= max_rows:
+        raise ValueError(f"rows must be between 1 and {max_rows}")
+    if not 1 <= cols <= max_cols:
+        raise ValueError(f"cols must be between 1 and {max_cols}")
+    if not 2 <= connect <= max(rows, cols):
+        raise ValueError(f"connect must be between 2 and {max(rows, cols)} on a {rows}x{cols} board")
+    board = board_from_moves(moves, *geometry)  # raises on illegal moves
+    if not board.get_valid_moves():
+        raise ValueError("No valid moves available")
+    return (str(moves), algorithm, evaluation, depth, movetime) + geometry
+
+
+# ----------------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------------
+_worker_updates = None  # multiprocessing.Queue back to the server
+_worker_engines = {}  # per worker process: (algorithm, evaluation) -> Engine, so its caches are reused
+
+
+def _init_worker(updates):
+    global _worker_updates
+    _worker_updates = updates
+
+
+def _analyse(request):
+    """Search one request, sending ("info" / "result" / "error", request, dict) updates to the server"""
+    moves, algorithm, evaluation, depth, movetime, rows, cols, connect = request
+    try:
+        engine = _worker_engines.get((algorithm, evaluation))
+        if engine is None:
+            engine = _worker_engines[algorithm, evaluation] = Engine(algorithm, evaluation=evaluation,
+                                                                     eval_cache_size=WORKER_EVAL_CACHE)
+        board = board_from_moves(moves, rows, cols, connect)
+        report = lambda result: _worker_updates.put(("info", request, result.to_dict()))
+        if movetime is None and algorithm != "mcts":
+            # a fixed depth is one iteration in the engine: deepen here so clients see progress
+            remaining = rows * cols - len(board.move_history)
+            for shallower in range(1, min(depth, remaining + 1)):
+                engine.search(board, depth=shallower, on_iteration=report)
+        result = engine.search(board, depth=depth, movetime=movetime, on_iteration=report)
+        _worker_updates.put(("result", request, result.to_dict()))
+    except Exception as e:
+        _worker_updates.put(("error", request, {"error": f"{type(e).__name__}: {e}"}))
+
+
+# ----------------------------------------------------------------------
+# Server side
+# ----------------------------------------------------------------------
+class Analysis:
+    """Updates of one request so far; any number of clients can stream them"""
+    def __init__(self, request, updates=None, cached=False):
+        self.request = request
+        self.updates = updates if updates is not None else []  # JSON-ready dicts
+        self.done = updates is not None
+        self.cached = cached
+        self.condition = threading.Condition()
+
+    def add(self, update, done=False):
+        with self.condition:
+            self.updates.append(update)
+            self.done = done
+            self.condition.notify_all()
+
+    def stream(self):
+        """Yield every update, waiting for new ones until the analysis is done"""
+        sent = 0
+        while True:
+            with self.condition:
+                while sent == len(self.updates) and not self.done:
+                    self.condition.wait()
+                pending, done = self.updates[sent:], self.done
+            yield from pending
+            sent += len(pending)
+            if done and sent == len(self.updates):
+                return
+
+
+class AnalysisService:
+    """Engine worker pool with in-flight deduplication and a bounded LRU result cache"""
+    def __init__(self, workers=None, cache_size=DEFAULT_CACHE_SIZE, max_depth=MAX_DEPTH, max_movetime=MAX_MOVETIME):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.max_depth = max_depth  # limits of the requests accepted (see parse_request)
+        self.max_movetime = max_movetime
+        self.cache = OrderedDict()  # request -> finished updates, least recently used first
+        self.in_flight = {}  # request -> Analysis
+        self.lock = threading.Lock()
+        self.hits = self.joined = self.searches = 0
+        self.updates = multiprocessing.Queue()
+        self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self.updates,))
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, request):
+        """The Analysis of a parsed request: cached, already running, or newly started"""
+        with self.lock:
+            updates = self.cache.get(request)
+            if updates is not None:
+                self.cache.move_to_end(request)
+                self.hits += 1
+                updates = updates[:-1] + [dict(updates[-1], cached=True)]
+                return Analysis(request, updates, cached=True)
+            analysis = self.in_flight.get(request)
+            if analysis is not None:
+                self.joined += 1
+                return analysis
+            analysis = self.in_flight[request] = Analysis(request)
+            self.searches += 1
+        self.pool.apply_async(_analyse, (request,))
+        return analysis
+
+    def _dispatch(self):
+        """Route worker updates to their analyses (one queue, so the result always comes last)"""
+        while True:
+            message = self.updates.get()
+            if message is None:
+                return
+            kind, request, data = message
+            with self.lock:
+                analysis = self.in_flight.get(request)
+            if analysis is None:
+                continue
+            update = dict(data, type=kind)
+            if kind == "result":
+                update["cached"] = False
+            analysis.add(update, done=kind != "info")
+            if kind == "info":
+                continue
+            with self.lock:
+                # moved to the cache in one step, so a new identical request finds one or the other
+                del self.in_flight[request]
+                if kind == "result" and self.cache_size:
+                    self.cache[request] = analysis.updates
+                    while len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+
+    def to_dict(self):
+        with self.lock:
+            return {"workers": self.workers, "searches": self.searches, "cache_hits": self.hits,
+                    "joined_in_flight": self.joined, "in_flight": len(self.in_flight),
+                    "cached": len(self.cache), "cache_size": self.cache_size,
+                    "max_depth": self.max_depth, "max_movetime": self.max_movetime}
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.updates.put(None)
+        self.dispatcher.join()
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    service = None  # AnalysisService, set by make_server
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._send_json(200, self.service.to_dict())
+        elif url.path == "/analyse":
+            self._analyse({name: values[-1] for name, values in parse_qs(url.query).items()})
+        else:
+            self._send_json(404, {"type": "error", "error": f"Unknown path: {url.path}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/analyse":
+            self._send_json(404, {"type": "error", "error": f"Unknown path: {self.path}"})
+            return
+        try:
+            fields = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"type": "error", "error": f"Invalid JSON: {e}"})
+            return
+        self._analyse(fields)
+
+    def _analyse(self, fields):
+        try:
+            request = parse_request(fields, self.service.max_depth, self.service.max_movetime)
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"type": "error", "error": str(e)})
+            return
+        analysis = self.service.submit(request)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for update in analysis.stream():
+                self.wfile.write(json.dumps(update).encode() + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away; the search still finishes and is cached
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode() + b"\n"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(service, host="127.0.0.1", port=DEFAULT_PORT):
+    """ThreadingHTTPServer answering with `service` (port 0 picks a free port)"""
+    handler = type("BoundAnalysisHandler", (AnalysisHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def stream_analysis(url, **fields):
+    """Client side: yield the update dicts of an analysis from a running server"""
+    with urlopen(f"{url.rstrip('/')}/analyse?{urlencode(fields)}") as response:
+        for line in response:
+            yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve engine analysis to local tools over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="engine processes (default: one per CPU)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="finished analyses kept")
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH, help="deepest search a request may ask for")
+    parser.add_argument("--max-movetime", type=float, default=MAX_MOVETIME,
+                        help="longest search a request may ask for, in seconds")
+    args = parser.parse_args()
+
+    service = AnalysisService(args.workers, args.cache_size, args.max_depth, args.max_movetime)
+    server = make_server(service, args.host, args.port)
+    print(f"Analysis server on http://{args.host}:{server.server_address[1]} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+asyncio facade of the Engine for hosting many games on one event loop.
+
+    async with AsyncEngine(workers=4, algorithm="alpha_beta", depth=6) as engine:
+        engine.new_game("table-1", budget=60.0)   # seconds for all of this game's moves
+        move = await engine.best_move(board, game="table-1", movetime=2.0)
+
+Searches run in a process pool, one iterative-deepening step (depth 1, 2, ...) at a
+time. Between steps a search gives its worker back, and free workers go to the
+waiting game that has used the least worker time so far, so one deep search cannot
+starve short ones. MCTS runs as a single step for its whole time budget.
+
+Cancelling the awaiting task stops the search: the running step is aborted in the
+worker (through the stop event of the worker slot it runs in, shared with the pool
+when it starts) and no further steps are started. A move's time
+is the smaller of movetime and what is left of the game's budget; depth 1 is always
+completed so there is a move to play even when the clock has run out.
+"""
+from engine import Engine, SearchResult
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import os
+
+WORKER_EVAL_CACHE = 1 << 16  # default eval cache entries of each worker engine
+
+_worker_engines = {}  # per worker process: options -> Engine, so its caches are reused
+_stop_events = None  # per worker process: the stop event of every slot
+
+
+def _init_worker(stop_events):
+    global _stop_events
+    _stop_events = stop_events
+
+
+def _search_step(options, board, depth, movetime, slot):
+    """Pool worker: one Engine.search, stoppable through the stop event of its slot"""
+    engine = _worker_engines.get(options)
+    if engine is None:
+        engine = _worker_engines[options] = Engine(**dict(options))
+    return engine.search(board, depth=depth, movetime=movetime, stop_event=_stop_events[slot])
+
+
+class AsyncEngine:
+    def __init__(self, workers=None, algorithm="alpha_beta", depth=4, **engine_options):
+        """engine_options are passed to the Engine of every worker (no workers / movetime there)"""
+        if "workers" in engine_options or "movetime" in engine_options:
+            raise ValueError("Pass workers to AsyncEngine and movetime to best_move")
+        engine_options.setdefault("eval_cache_size", WORKER_EVAL_CACHE)
+        Engine(algorithm, depth=depth, **engine_options)  # validate the options here, not in a worker
+        self.algorithm = algorithm
+        self.depth = depth
+        self.options = tuple(sorted(dict(engine_options, algorithm=algorithm, depth=depth).items()))
+        self.workers = workers or os.cpu_count() or 1
+        # a stop event per worker slot: at most `workers` steps run at once, each in a slot of its own
+        self.stop_events = [multiprocessing.Event() for _ in range(self.workers)]
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.stop_events,))
+
+        # fair scheduling: a free worker goes to the waiting search whose game used the least worker time
+        self.free = list(range(self.workers))  # free slots
+        self.waiting = []  # heap of (worker seconds used, sequence, future)
+        self.used = {}  # game -> worker seconds used (kept between moves for games started with new_game)
+        self.clocks = {}  # game -> seconds left of its time budget (None: unlimited)
+        self.sequence = itertools.count()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def new_game(self, game, budget=None):
+        """Start the clock of a game: budget seconds (None for unlimited) for all its moves"""
+        self.clocks[game] = budget
+        self.used[game] = 0.0
+
+    def end_game(self, game):
+        self.clocks.pop(game, None)
+        self.used.pop(game, None)
+
+    def time_left(self, game):
+        return self.clocks.get(game)
+
+    async def best_move(self, board, depth=None, movetime=None, game=None):
+        return (await self.search(board, depth, movetime, game)).move
+
+    async def search(self, board, depth=None, movetime=None, game=None):
+        """
+        Search the position and return a SearchResult (nodes summed over all steps,
+        completed when the requested depth was reached). With a time limit (movetime or
+        the game's budget) the search deepens up to `depth` or the end of the game.
+        """
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        key = game if game is not None else ("search", next(self.sequence))
+        self.used.setdefault(key, 0.0)
+
+        budget = movetime
+        clock = self.clocks.get(game) if game is not None else None
+        if clock is not None:
+            budget = clock if budget is None else min(budget, clock)
+        deadline = start_time + budget if budget is not None else None
+
+        if self.algorithm == "mcts":
+            steps = [None]
+        else:
+            remaining = board.rows * board.cols - len(board.move_history)
+            depth = depth if depth is not None else (self.depth if budget is None else remaining)
+            steps = range(1, max(min(depth, remaining), 1) + 1)
+
+        running = {"slot": None, "stopped": False}  # the slot of the step running, if any
+        timer = None
+        result, nodes = None, 0
+        try:
+            for step_depth in steps:
+                if result is not None and deadline is not None:
+                    if loop.time() >= deadline:
+                        break
+                    if timer is None:
+                        timer = loop.call_at(deadline, self._stop, running)
+                slot = await self._acquire(key)
+                self.stop_events[slot].clear()
+                running["slot"] = slot
+                if running["stopped"]:
+                    self.stop_events[slot].set()
+                step_start = loop.time()
+                future = self.executor.submit(_search_step, self.options, board, step_depth,
+                                              budget if step_depth is None else None, slot)
+                future.add_done_callback(lambda _, started=step_start, slot=slot: loop.call_soon_threadsafe(
+                    self._finished, key, started, slot, running))
+                step = await asyncio.wrap_future(future)
+                nodes += step.nodes
+                if result is not None and not step.completed:
+                    break  # stopped at the deadline: keep the last completed depth
+                result = step
+        except asyncio.CancelledError:
+            self._stop(running)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            elapsed = loop.time() - start_time
+            if game not in self.clocks:  # one-off searches and games not started with new_game
+                self.used.pop(key, None)
+            elif self.clocks.get(game) is not None:
+                self.clocks[game] = max(self.clocks[game] - elapsed, 0.0)
+
+        completed = result.completed and (self.algorithm == "mcts" or result.depth == steps[-1])
+        return SearchResult(result.move, result.score, result.depth, nodes, elapsed, completed, result.stats,
+                            bounds=result.bounds)
+
+    async def _acquire(self, key):
+        """Wait for a free worker slot, handed out by least worker time used"""
+        if self.free and not self.waiting:
+            return self.free.pop()
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiting, (self.used.get(key, 0.0), next(self.sequence), waiter))
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(waiter.result())  # the slot was handed over just as we were cancelled
+            raise
+
+    def _release(self, slot):
+        while self.waiting:
+            _, _, waiter = heapq.heappop(self.waiting)
+            if not waiter.done():
+                waiter.set_result(slot)
+                return
+        self.free.append(slot)
+
+    def _stop(self, running):
+        """Stop a search: its running step now, and any step it starts later"""
+        running["stopped"] = True
+        if running["slot"] is not None:
+            self.stop_events[running["slot"]].set()
+
+    def _finished(self, key, started, slot, running):
+        """A step left its worker slot (done, aborted or cancelled before it ran)"""
+        if key in self.used:
+            self.used[key] += asyncio.get_running_loop().time() - started
+        if running["slot"] == slot:  # the search may already be waiting for its next step's slot
+            running["slot"] = None
+        self._release(slot)
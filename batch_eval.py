@@ -0,0 +1,88 @@
+"""
+Vectorised evaluate_board for many positions at once (needs NumPy).
+
+The boards are stacked into an (N, rows, cols) int8 array. Every window of connect
+cells in the four directions is taken as a strided view (no copying), turned into a base-3 code of
+its cells and scored with a lookup table built from MinimaxUtils.evaluate_window, so
+the scores are exactly those of the scalar evaluate_board.
+
+    scores = evaluate_batch(boards)   # int64 array, scores[i] == evaluate_board(boards[i])
+"""
+from numpy.lib.stride_tricks import as_strided, sliding_window_view
+from MinimaxUtils import MinimaxUtils
+from geometry import DEFAULT_CONNECT
+from functools import lru_cache
+from itertools import product
+import numpy as np
+
+EMPTY = 0
+PLAYER = 1
+AI = 2
+
+CENTER_WEIGHT = 6  # per AI piece in the centre column, as in evaluate_board
+
+
+@lru_cache(maxsize=None)
+def window_scores(connect=DEFAULT_CONNECT):
+    """AI's minus the human's evaluate_window score for every window, indexed by base-3 code"""
+    utils = MinimaxUtils()
+    scores = np.zeros(3 ** connect, dtype=np.int64)
+    for cells in product((EMPTY, PLAYER, AI), repeat=connect):
+        window = list(cells)
+        code = sum(cell * 3 ** i for i, cell in enumerate(window))
+        scores[code] = utils.evaluate_window(window, AI, PLAYER) - utils.evaluate_window(window, PLAYER, AI)
+    scores.flags.writeable = False
+    return scores
+
+
+def stack_boards(boards):
+    """(N, rows, cols) int8 array of Board objects (an array is passed through)"""
+    if isinstance(boards, np.ndarray):
+        return boards.astype(np.int8, copy=False).reshape(-1, *boards.shape[-2:])
+    if not boards:
+        return np.zeros((0, 0, 0), dtype=np.int8)
+    return np.array([board.board for board in boards], dtype=np.int8)
+
+
+def child_positions(board, cols, piece):
+    """(len(cols), rows, cols) array of the positions after dropping piece into each column"""
+    children = np.repeat(np.array(board.board, dtype=np.int8)[np.newaxis], len(cols), axis=0)
+    heights = board.column_heights
+    children[np.arange(len(cols)), [heights[col] for col in cols], cols] = piece
+    return children
+
+
+def windows(cells, connect=DEFAULT_CONNECT):
+    """Strided views of all windows of connect cells: horizontal, vertical and both diagonals"""
+    cells = np.ascontiguousarray(cells)
+    n, rows, cols = cells.shape
+    s_n, s_r, s_c = cells.strides
+    views = []
+    if cols >= connect:
+        views.append(sliding_window_view(cells, connect, axis=2))
+    if rows >= connect:
+        views.append(sliding_window_view(cells, connect, axis=1))
+    if rows >= connect and cols >= connect:
+        shape = (n, rows - connect + 1, cols - connect + 1, connect)
+        # (r + i, c + i) starting at column 0, (r + i, c - i) starting at column connect - 1
+        views.append(as_strided(cells, shape, (s_n, s_r, s_c, s_r + s_c), writeable=False))
+        views.append(as_strided(cells[:, :, connect - 1:], shape, (s_n, s_r, s_c, s_r - s_c), writeable=False))
+    return views
+
+
+def evaluate_batch(boards, center_weight=CENTER_WEIGHT, connect=DEFAULT_CONNECT, table=None):
+    """
+    evaluate_board for every board (Board objects or an (N, rows, cols) array) as an int64 array.
+    table: window score by base-3 code (default: MinimaxUtils' own, see window_scores).
+    """
+    cells = stack_boards(boards)
+    if not len(cells):
+        return np.zeros(0, dtype=np.int64)
+    scores = (cells[:, :, cells.shape[2] // 2] == AI).sum(axis=1, dtype=np.int64) * center_weight
+    if table is None:
+        table = window_scores(connect)
+    pow3 = 3 ** np.arange(connect, dtype=np.intp)
+    for view in windows(cells, connect):
+        codes = view.astype(np.intp) @ pow3
+        scores += table[codes].sum(axis=(1, 2))
+    return scores
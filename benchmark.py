@@ -0,0 +1,261 @@
+"""
+Benchmark every search algorithm on the fixed position corpus (bench_positions.json).
+
+    python benchmark.py --depths 1,2,3,4 --out bench.json
+    python benchmark.py --runners engine_alpha_beta --phases endgame --depths 5,6
+    python benchmark.py --mcts-scaling 8    (MCTS playouts/sec on 1..8 worker processes)
+
+For each runner, depth and position it reports wall time, nodes, nodes/sec,
+effective branching factor (nodes ** (1 / depth)) and peak traced memory.
+The JSON output is meant to be diffed between commits.
+"""
+from engine import Engine, board_from_moves
+from disk_cache import DiskCache
+from MinimaxUtils import MinimaxUtils
+from minimaxx import minimax_with_tree
+from abPruning import alpha_beta_with_tree
+from expecti import expecti_with_tree
+from contextlib import redirect_stdout
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_positions.json")
+
+
+def run_minimax_with_tree(board, depth, utils):
+    score, col, nodes = minimax_with_tree(board, depth, True, utils)
+    return score, col, nodes
+
+
+def run_alpha_beta_with_tree(board, depth, utils):
+    score, col, nodes = alpha_beta_with_tree(board, depth, float('-inf'), float('inf'), True, utils)
+    return score, col, nodes
+
+
+def run_expecti_with_tree(board, depth, utils):
+    score, col, nodes = expecti_with_tree(board, depth, True, utils)
+    return score, col, nodes
+
+
+def engine_runner(algorithm, **options):
+    def run(board, depth, utils):
+        engine = Engine(algorithm, depth=depth, utils=utils, **options)
+        try:
+            result = engine.search(board, maximizing=True)
+        finally:
+            engine.close()
+        return result.score, result.move, result.nodes
+    return run
+
+
+def disk_cache_runner(algorithm, **options):
+    """Engine runner with a fresh DiskCache file per search, so node counts stay deterministic"""
+    def run(board, depth, utils):
+        with tempfile.TemporaryDirectory() as scratch:
+            cache = DiskCache(os.path.join(scratch, "bench.cache"), num_slots=1 << 14)
+            engine = Engine(algorithm, depth=depth, utils=utils, disk_cache=cache, **options)
+            try:
+                result = engine.search(board, maximizing=True)
+            finally:
+                engine.close()
+                cache.close()
+            if depth >= engine.disk_cache_min_depth and not cache.stores:
+                raise RuntimeError("The disk cache was not used")
+        return result.score, result.move, result.nodes
+    return run
+
+
+# name -> function(board, depth, utils) returning (score, col, nodes)
+# The *_with_tree functions count nodes their own way (the numbers the GUI shows);
+# the engine runners count every visited node.
+RUNNERS = {
+    "minimax_with_tree": run_minimax_with_tree,
+    "alpha_beta_with_tree": run_alpha_beta_with_tree,
+    "expecti_with_tree": run_expecti_with_tree,
+    "engine_minimax": engine_runner("minimax"),
+    "engine_alpha_beta": engine_runner("alpha_beta"),
+    "engine_expectiminimax": engine_runner("expectiminimax"),
+    "batched_minimax": engine_runner("minimax", batch_leaves=True),  # needs NumPy
+    "batched_alpha_beta": engine_runner("alpha_beta", batch_leaves=True),
+    "batched_expectiminimax": engine_runner("expectiminimax", batch_leaves=True),
+    "delta_minimax": engine_runner("minimax", delta_leaves=True),
+    "delta_alpha_beta": engine_runner("alpha_beta", delta_leaves=True),
+    "delta_expectiminimax": engine_runner("expectiminimax", delta_leaves=True),
+    "ordered_alpha_beta": engine_runner("alpha_beta", delta_leaves=True, order_moves=True),
+    "parallel_expectiminimax": engine_runner("expectiminimax", workers=max(2, os.cpu_count() or 1)),
+    "disk_cache_alpha_beta": disk_cache_runner("alpha_beta"),
+    "disk_cache_expectiminimax": disk_cache_runner("expectiminimax"),
+    "sampled_expectiminimax": engine_runner("expectiminimax", chance_samples=2, adaptive=True, seed=0),
+}
+
+
+def load_corpus(path=CORPUS_PATH, phases=None):
+    with open(path) as f:
+        corpus = json.load(f)
+    if phases:
+        corpus["positions"] = [p for p in corpus["positions"] if p["phase"] in phases]
+    return corpus
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(CORPUS_PATH)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_one(runner, moves, depth, measure_memory):
+    """Run a single search on a fresh board, silencing any tree output"""
+    board = board_from_moves(moves)
+    utils = MinimaxUtils()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if measure_memory:
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        score, col, nodes = runner(board, depth, utils)
+        elapsed = time.perf_counter() - start_time
+        peak = None
+        if measure_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return score, col, nodes, elapsed, peak
+
+
+def run_benchmark(runner_names, depths, corpus, repeat=1, measure_memory=True, progress=None):
+    results = []
+    for name in runner_names:
+        runner = RUNNERS[name]
+        for depth in depths:
+            for position in corpus["positions"]:
+                # best of `repeat` untraced runs for timing, a separate traced run for memory
+                times = []
+                for _ in range(repeat):
+                    score, col, nodes, elapsed, _ = run_one(runner, position["moves"], depth, False)
+                    times.append(elapsed)
+                peak = run_one(runner, position["moves"], depth, True)[4] if measure_memory else None
+                wall_time = min(times)
+                entry = {
+                    "runner": name,
+                    "depth": depth,
+                    "position": position["name"],
+                    "phase": position["phase"],
+                    "move": col,
+                    "score": score,
+                    "nodes": nodes,
+                    "wall_time": wall_time,
+                    "nps": nodes / wall_time if wall_time > 0 else 0.0,
+                    "ebf": nodes ** (1.0 / depth) if nodes > 0 else 0.0,
+                    "peak_memory": peak,
+                }
+                results.append(entry)
+                if progress is not None:
+                    progress(entry)
+    return results
+
+
+def mcts_scaling(max_workers, movetime=2.0, moves="3", modes=("root", "leaf")):
+    """Playouts/sec of MCTS on 1..max_workers processes for each parallel mode"""
+    board = board_from_moves(moves)
+    results = []
+    for mode in modes:
+        for workers in range(1, max_workers + 1):
+            engine = Engine("mcts", movetime=movetime, workers=workers, parallel=mode, seed=workers)
+            try:
+                engine.search(board, movetime=0.1)  # start the pool outside the measurement
+                engine.new_game()
+                result = engine.search(board)
+            finally:
+                engine.close()
+            results.append({"mode": mode, "workers": workers, "playouts": result.nodes,
+                            "wall_time": result.elapsed, "playouts_per_sec": result.nps})
+        base = results[-max_workers]["playouts_per_sec"]
+        for r in results[-max_workers:]:
+            r["speedup"] = r["playouts_per_sec"] / base if base > 0 else 0.0
+    return results
+
+
+def summarize(results):
+    """Totals per (runner, depth) over the corpus"""
+    summary = {}
+    for r in results:
+        s = summary.setdefault((r["runner"], r["depth"]),
+                               {"runner": r["runner"], "depth": r["depth"], "nodes": 0, "wall_time": 0.0,
+                                "peak_memory": 0, "positions": 0})
+        s["nodes"] += r["nodes"]
+        s["wall_time"] += r["wall_time"]
+        s["positions"] += 1
+        if r["peak_memory"] is not None:
+            s["peak_memory"] = max(s["peak_memory"], r["peak_memory"])
+    for s in summary.values():
+        s["nps"] = s["nodes"] / s["wall_time"] if s["wall_time"] > 0 else 0.0
+        s["ebf"] = (s["nodes"] / s["positions"]) ** (1.0 / s["depth"]) if s["nodes"] else 0.0
+    return list(summary.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search algorithms on a fixed position corpus")
+    parser.add_argument("--runners", default=",".join(RUNNERS), help="comma separated, from: " + ", ".join(RUNNERS))
+    parser.add_argument("--depths", default="1,2,3", help="comma separated search depths")
+    parser.add_argument("--phases", default=None, help="only these phases (opening,middlegame,endgame)")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--repeat", type=int, default=1, help="timing runs per search, best one is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--out", default=None, help="write machine-readable JSON results here")
+    parser.add_argument("--mcts-scaling", type=int, default=None, metavar="N",
+                        help="instead measure MCTS playouts/sec scaling on 1..N worker processes")
+    parser.add_argument("--mcts-time", type=float, default=2.0, help="seconds per MCTS scaling run")
+    args = parser.parse_args()
+
+    if args.mcts_scaling:
+        results = mcts_scaling(args.mcts_scaling, args.mcts_time)
+        for r in results:
+            print(f"mcts {r['mode']:5} workers={r['workers']:<3} {r['playouts']:9} playouts "
+                  f"{r['playouts_per_sec']:10,.0f} playouts/s  x{r['speedup']:.2f}")
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump({"commit": git_commit(), "python": platform.python_version(), "cpus": os.cpu_count(),
+                           "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "mcts_scaling": results}, f, indent=2)
+        return
+
+    runner_names = args.runners.split(",")
+    for name in runner_names:
+        if name not in RUNNERS:
+            parser.error(f"unknown runner: {name}")
+    depths = [int(d) for d in args.depths.split(",")]
+    corpus = load_corpus(args.corpus, args.phases.split(",") if args.phases else None)
+
+    def progress(r):
+        memory = f"{r['peak_memory'] / 1024:9.0f} KiB" if r["peak_memory"] is not None else ""
+        print(f"{r['runner']:24} d={r['depth']} {r['position']:8} {r['wall_time']:9.4f}s "
+              f"{r['nodes']:9} nodes {r['nps']:10,.0f} n/s ebf {r['ebf']:5.2f} {memory}")
+
+    results = run_benchmark(runner_names, depths, corpus, args.repeat, not args.no_memory, progress)
+    summary = summarize(results)
+
+    print("\nTotals:")
+    for s in summary:
+        print(f"{s['runner']:24} d={s['depth']} {s['wall_time']:9.4f}s {s['nodes']:10} nodes "
+              f"{s['nps']:10,.0f} n/s ebf {s['ebf']:5.2f}")
+
+    if args.out:
+        report = {
+            "corpus_version": corpus["version"],
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+            "summary": summary,
+        }
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,47 @@
+from geometry import get_geometry
+
 empty = 0
 player = 1
 AI = 2
 
 rows = 6
 cols = 7
+connect = 4
+
+# Zobrist keys of the standard board: one random 64-bit number per (piece, row, col), fixed
+# seed so keys are identical across processes and sessions (other sizes: see geometry.py)
+ZOBRIST = get_geometry(rows, cols, connect).zobrist
 
 class Board:
-    def __init__(self):
+    def __init__(self, rows=rows, cols=cols, connect=connect):
+        self.geometry = get_geometry(rows, cols, connect) # window / hash tables shared by all boards of this size
+
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.zobrist = self.geometry.zobrist
+
         self.board = [[empty for n in range(cols)] for n in range(rows)]
         
         self.column_heights = [0] * cols # keeps track of the top of each column
         
         self.move_history = [] # needed for unde_move method
 
+        self.hash = 0 # Zobrist key of the position, updated by drop_piece / undo_move
+
+        self.full_columns = 0 # bit c set while column c is full (indexes the chance outcome tables)
+
     def drop_piece(self, col, piece):
         row = self.column_heights[col]
 
         self.board[row][col] = piece
         
+        self.hash ^= self.zobrist[piece][row][col]
+        
         self.column_heights[col] += 1
+
+        if self.column_heights[col] == self.rows:
+            self.full_columns |= 1 << col
         
         self.move_history.append(col)
         
@@ -26,23 +49,27 @@ class Board:
         col = self.move_history.pop()
         
         self.column_heights[col] -= 1
+
+        self.full_columns &= ~(1 << col)
         
         row = self.column_heights[col]
         
+        self.hash ^= self.zobrist[self.board[row][col]][row][col]
+        
         self.board[row][col] = empty
 
     def is_valid_location(self, col):
-        return self.column_heights[col] < rows
+        return self.column_heights[col] < self.rows
 
     def get_valid_moves(self):
         moves = []
-        for col in range(cols):
+        for col in range(self.cols):
             if self.is_valid_location(col):
                 moves.append(col)
         return moves
     
     def is_board_full(self):
-        return len(self.move_history) == rows * cols
+        return len(self.move_history) == self.rows * self.cols
 
     def is_full(self):
         for row in self.board:
@@ -50,8 +77,10 @@ class Board:
                 return False
         return True
     def copy(self):
-        new_board = Board()
+        new_board = Board(self.rows, self.cols, self.connect)
         new_board.board = [row[:] for row in self.board]
         new_board.column_heights = self.column_heights[:]
         new_board.move_history = self.move_history[:]
+        new_board.hash = self.hash
+        new_board.full_columns = self.full_columns
         return new_board
\ No newline at end of file
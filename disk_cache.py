@@ -0,0 +1,138 @@
+"""
+Persistent search result cache shared across sessions and processes.
+
+(position key, search variant, depth) -> (score, bound, best move), stored in a
+fixed-size memory-mapped file:
+
+    header  | magic, version, slot count, write counter
+    buckets | BUCKET_SLOTS slots of SLOT_SIZE bytes each
+
+The variant is a 32-bit fingerprint of the settings the scores depend on (see
+Engine.cache_variant), so engines configured differently never share results.
+
+A position hashes to one bucket. Storing into a full bucket evicts the shallowest
+entry (oldest first among equal depths), so deep, expensive results survive longest.
+Readers never lock: every slot carries a checksum over its contents, and a slot that
+is being rewritten by another process simply reads as a miss. Writers serialise on an
+exclusive flock of the file (where fcntl is available) plus a thread lock. A new
+file is created in place and its header written under the same flock, so processes
+opening it at the same time never replace each other's file.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes are only serialised within this process
+    fcntl = None
+
+MAGIC = b"C4TT"
+VERSION = 2
+HEADER = struct.Struct("<4sIQQ")  # magic, version, slot count, write counter
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QQdIBBbI")  # key, check, score, variant, depth, flags, move, age
+SLOT_SIZE = SLOT.size
+PAYLOAD = struct.Struct("<dIBBbI")
+BUCKET_SLOTS = 4
+
+FLAG_INT_SCORE = 0x80  # score was an int (kept so cached scores compare and print like fresh ones)
+BOUND_MASK = 0x03
+
+MASK64 = (1 << 64) - 1
+
+
+def _check(key, score, variant, depth, flags, move, age):
+    crc = zlib.crc32(PAYLOAD.pack(score, variant, depth, flags, move, age))
+    return (key ^ (crc * 0x9E3779B97F4A7C15)) & MASK64 or 1  # 0 marks an empty slot
+
+
+class DiskCache:
+    def __init__(self, path, num_slots=1 << 20):
+        self.path = path
+        self.lock = threading.Lock()
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+        num_slots -= num_slots % BUCKET_SLOTS
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o666), "r+b")
+        self._initialise(num_slots)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, slots, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} search cache")
+        self.num_slots = slots
+        self.num_buckets = slots // BUCKET_SLOTS
+
+    def _initialise(self, num_slots):
+        """Write the header of a new (empty) file; whoever takes the flock first does it"""
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.file.fileno()).st_size < HEADER_SIZE:
+                self.file.seek(0)
+                self.file.write(HEADER.pack(MAGIC, VERSION, num_slots, 0).ljust(HEADER_SIZE, b"\0"))
+                self.file.truncate(HEADER_SIZE + num_slots * SLOT_SIZE)
+                self.file.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def _bucket_offset(self, key):
+        return HEADER_SIZE + (key % self.num_buckets) * BUCKET_SLOTS * SLOT_SIZE
+
+    def probe(self, key, variant, depth):
+        """(score, bound, best_col) for exactly this key, variant and depth, or None"""
+        self.probes += 1
+        offset = self._bucket_offset(key)
+        for i in range(BUCKET_SLOTS):
+            slot_key, check, score, slot_variant, slot_depth, flags, move, age = \
+                SLOT.unpack_from(self.map, offset + i * SLOT_SIZE)
+            if slot_key != key or slot_variant != variant or slot_depth != depth:
+                continue
+            if check != _check(slot_key, score, slot_variant, slot_depth, flags, move, age):
+                return None  # torn or concurrent write
+            self.hits += 1
+            if flags & FLAG_INT_SCORE:
+                score = int(score)
+            return score, flags & BOUND_MASK, move if move >= 0 else None
+        return None
+
+    def store(self, key, variant, depth, score, bound, best_col):
+        flags = bound | (FLAG_INT_SCORE if isinstance(score, int) else 0)
+        move = best_col if best_col is not None else -1
+        offset = self._bucket_offset(key)
+        with self.lock:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            try:
+                magic, version, slots, counter = HEADER.unpack_from(self.map, 0)
+                age = counter & 0xFFFFFFFF
+                HEADER.pack_into(self.map, 0, magic, version, slots, counter + 1)
+
+                # same entry > empty slot > shallowest (then oldest) entry
+                victim, victim_rank = 0, None
+                for i in range(BUCKET_SLOTS):
+                    slot_key, check, _, slot_variant, slot_depth, _, _, slot_age = \
+                        SLOT.unpack_from(self.map, offset + i * SLOT_SIZE)
+                    if check == 0 or (slot_key == key and slot_variant == variant and slot_depth == depth):
+                        victim = i
+                        break
+                    rank = (slot_depth, (slot_age - age) & 0xFFFFFFFF)
+                    if victim_rank is None or rank < victim_rank:
+                        victim, victim_rank = i, rank
+
+                SLOT.pack_into(self.map, offset + victim * SLOT_SIZE, key,
+                               _check(key, float(score), variant, depth, flags, move, age),
+                               float(score), variant, depth, flags, move, age)
+                self.stores += 1
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
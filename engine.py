@@ -0,0 +1,846 @@
+from board import Board
+from geometry import DEFAULT_GEOMETRY, DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT
+from MinimaxUtils import MinimaxUtils
+from expecti import PROB_CHOSEN, PROB_NEIGHBOR, PROB_EDGE_NEIGHBOR, build_outcome_table, check_slip_probabilities
+from stats import SearchStats
+from tracing import ChromeTracer, NULL_SPAN
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from disk_cache import DiskCache
+from mcts import MCTS, ParallelMCTS
+from eval_cache import EvalCache
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+import zlib
+
+try:
+    import batch_eval
+except ImportError:  # NumPy not installed: batched leaf evaluation is unavailable
+    batch_eval = None
+
+EMPTY = 0
+PLAYER = 1
+AI = 2
+
+ALGORITHMS = ("minimax", "alpha_beta", "expectiminimax", "mcts")
+
+CHECK_INTERVAL = 256  # nodes between stop / deadline checks
+
+CONFIDENCE_Z = 1.96  # half-width of the sampled expectiminimax bounds in standard errors (95%)
+
+
+class WindowsOnlyUtils(MinimaxUtils):
+    """Evaluation variant without the centre-column bonus"""
+    center_weight = 0
+
+
+# Evaluation variants selectable by name (tournaments, CLI)
+EVALUATORS = {
+    "default": MinimaxUtils,
+    "windows_only": WindowsOnlyUtils,
+}
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when stop() was called or the time budget ran out"""
+
+
+def side_to_move(board):
+    """The human always starts, so the AI is to move after an odd number of moves"""
+    return AI if len(board.move_history) % 2 == 1 else PLAYER
+
+
+def board_from_moves(moves, rows=DEFAULT_ROWS, cols=DEFAULT_COLS, connect=DEFAULT_CONNECT):
+    """Build a board (of the given geometry) by replaying a list (or digit string) of columns, human first"""
+    board = Board(rows, cols, connect)
+    piece = PLAYER
+    for col in moves:
+        col = int(col)
+        if not (0 <= col < cols) or not board.is_valid_location(col):
+            raise ValueError(f"Illegal move: column {col}")
+        board.drop_piece(col, piece)
+        piece = AI if piece == PLAYER else PLAYER
+    return board
+
+
+_worker_engines = {}  # per worker process: options -> Engine, so its eval cache is reused
+
+
+def _search_outcome(task):
+    """Pool worker of the parallel expectiminimax: value, stats and trace events (or None) of one outcome subtree"""
+    board, depth, root_moves, utils, trace, options = task
+    engine = _worker_engines.get(options)
+    if engine is None:
+        _, batch_leaves, delta_leaves, eval_cache_size, slip_probabilities, _ = options
+        engine = _worker_engines[options] = Engine("expectiminimax", utils=utils, batch_leaves=batch_leaves,
+                                                   delta_leaves=delta_leaves, eval_cache_size=eval_cache_size,
+                                                   slip_probabilities=slip_probabilities)
+        engine.outcome_table = build_outcome_table(*slip_probabilities, cols=board.cols)
+    engine.stats = SearchStats()
+    engine.root_moves = root_moves
+    engine.tracer = ChromeTracer() if trace else None
+    with engine.tracer.span("outcome subtree", "worker", moves=len(board.move_history), depth=depth) \
+            if trace else NULL_SPAN:
+        value, _ = engine._expectiminimax(board, depth, False)
+    events, engine.tracer = engine.tracer.events if trace else None, None
+    return value, engine.stats, events
+
+
+class SearchResult:
+    """Outcome of one Engine.search call"""
+    def __init__(self, move, score, depth, nodes, elapsed, completed=True, stats=None, trace_path=None,
+                 bounds=None):
+        self.move = move
+        self.score = score
+        self.depth = depth  # deepest fully completed iteration
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.completed = completed  # False when stopped before the requested depth
+        self.stats = stats
+        self.trace_path = trace_path  # Chrome trace written for this search, if any
+        self.bounds = bounds  # sampled expectiminimax: root col -> (low, high) confidence bounds
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "move": self.move,
+            "score": self.score,
+            "depth": self.depth,
+            "nodes": self.nodes,
+            "elapsed": self.elapsed,
+            "nps": self.nps,
+            "completed": self.completed,
+            "bounds": self.bounds,
+            "stats": self.stats.to_dict() if self.stats is not None else None,
+        }
+
+
+class Engine:
+    """
+    Headless search engine (no Tkinter, no printing).
+    Returns the same move and score as the *_with_tree functions used by the GUI.
+    """
+    def __init__(self, algorithm="alpha_beta", depth=4, movetime=None, utils=None, evaluation="default",
+                 trace_dir=None, tt_size=None, tt=None, disk_cache=None,
+                 disk_cache_min_depth=3, eval_cache_size=None, eval_cache=None, batch_leaves=False,
+                 delta_leaves=False, order_moves=False, playouts=None, seed=None,
+                 workers=None, parallel="root", chance_samples=None, adaptive=False, root_samples=None,
+                 parallel_levels=1, slip_probabilities=None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        if evaluation not in EVALUATORS:
+            raise ValueError(f"Unknown evaluation: {evaluation}")
+        self.algorithm = algorithm
+        self.depth = depth
+        self.movetime = movetime  # seconds, enables iterative deepening
+        self.evaluation = evaluation
+        self.utils = utils if utils is not None else EVALUATORS[evaluation]()
+        self.trace_dir = trace_dir  # write a Chrome trace JSON per search into this directory
+
+        # Transposition table kept between searches (tree reuse, pondering). Pass `tt` to share one.
+        if tt is None and tt_size:
+            tt = TranspositionTable(tt_size)
+        # Persistent cache (a DiskCache or a file path) consulted and filled at nodes this deep or deeper
+        if isinstance(disk_cache, str):
+            disk_cache = DiskCache(disk_cache)
+        self.tt = tt
+        self.disk_cache = disk_cache
+        self.disk_cache_min_depth = disk_cache_min_depth
+        self.caching = False
+        # Leaf evaluation cache kept between searches. Pass `eval_cache` to share one.
+        if eval_cache is None and eval_cache_size:
+            eval_cache = EvalCache(eval_cache_size)
+        self.eval_cache = eval_cache
+        # Score all children of depth-1 nodes in one vectorised batch (needs NumPy)
+        if batch_leaves and batch_eval is None:
+            raise ValueError("Batched leaf evaluation needs NumPy")
+        self.batch_leaves = batch_leaves
+        # Score the children of depth-1 nodes from the parent's score plus MinimaxUtils.move_deltas
+        self.delta_leaves = delta_leaves
+        # Alpha-beta tries the moves with the best immediate evaluation change first.
+        # Same score, but among equally good moves a different one may be returned.
+        self.order_moves = order_moves
+
+        # Monte Carlo tree search: runs for movetime, or `playouts` playouts, instead of to a depth.
+        # Its tree is kept between searches. With several workers it runs on a process pool,
+        # `parallel` "root" (independent trees) or "leaf" (batched playouts); see ParallelMCTS.
+        self.playouts = playouts
+        if algorithm == "mcts" and workers and workers > 1:
+            self.mcts = ParallelMCTS(workers, parallel, seed=seed)
+        else:
+            self.mcts = MCTS(seed=seed)
+
+        # Sampled expectiminimax: each chance node draws `chance_samples` landing columns instead of
+        # expanding all of them, and the root reports confidence bounds per move. With `adaptive`
+        # the root keeps sampling the moves that could still be best (up to root_samples draws each)
+        # until the bounds separate the best move. The bounds only cover the sampling at the root.
+        if chance_samples is not None and disk_cache is not None:
+            raise ValueError("Sampled expectiminimax does not support the disk cache")
+        self.chance_samples = chance_samples
+        self.adaptive = adaptive
+        self.root_samples = root_samples if root_samples is not None else 8 * (chance_samples or 1)
+        self.rng = random.Random(seed)
+        self.root_bounds = None
+
+        # Parallel expectiminimax: the outcome subtrees `parallel_levels` chance levels below the
+        # root are searched on a pool of `workers` processes and merged in the serial order,
+        # so move and score are bit-for-bit those of the serial search.
+        self.workers = workers if algorithm == "expectiminimax" and workers and workers > 1 else None
+        if self.workers and chance_samples is not None:
+            raise ValueError("Parallel expectiminimax needs the exact search")
+        self.parallel_levels = parallel_levels
+        self.pool = None
+
+        # Slip model of expectiminimax: (chosen, each neighbour, the neighbour at an edge) probabilities
+        self.outcome_table = None  # its OutcomeTable for the board width searched (expectiminimax only)
+        self.set_slip_probabilities(*(slip_probabilities or (PROB_CHOSEN, PROB_NEIGHBOR, PROB_EDGE_NEIGHBOR)))
+
+        self.stop_event = threading.Event()
+        self.deadline = None
+        self.stats = SearchStats()
+        self.root_moves = 0
+        self.tracer = None
+        self.trace_root_depth = -1  # depth of the root while tracing (for per-root-move spans)
+
+    def stop(self):
+        """Ask the running search to return its best result so far (no effect between searches)"""
+        self.stop_event.set()
+
+    def set_slip_probabilities(self, prob_chosen, prob_neighbor, prob_edge_neighbor):
+        """
+        Switch the expectiminimax noise model (its outcome table is picked up by the next search).
+        The slip model is part of the disk cache variant, so each model keeps its own entries.
+        """
+        check_slip_probabilities(prob_chosen, prob_neighbor, prob_edge_neighbor)
+        self.slip_probabilities = (prob_chosen, prob_neighbor, prob_edge_neighbor)
+
+    def cache_variant(self):
+        """
+        Disk cache variant: a fingerprint of every setting that changes the stored scores.
+        The evaluation is identified by its class, centre weight and window score table,
+        so a custom utils object does not share results with the built-in ones.
+        """
+        settings = (self.algorithm, self._utils_fingerprint(),
+                    self.slip_probabilities if self.algorithm == "expectiminimax" else None)
+        return zlib.crc32(repr(settings).encode())
+
+    def _utils_fingerprint(self):
+        utils = self.utils
+        return (f"{type(utils).__module__}.{type(utils).__qualname__}", getattr(utils, "center_weight", None),
+                tuple(getattr(utils, "window_scores", ())))
+
+    def close(self):
+        """Shut down the worker processes of a parallel search"""
+        if isinstance(self.mcts, ParallelMCTS):
+            self.mcts.close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def new_game(self):
+        """Forget everything learned from previous searches"""
+        if self.tt is not None:
+            self.tt.clear()
+        if self.eval_cache is not None:
+            self.eval_cache.clear()
+        self.mcts.clear()
+
+    def best_move(self, board, **kwargs):
+        return self.search(board, **kwargs).move
+
+    def search(self, board, depth=None, movetime=None, maximizing=None, on_iteration=None, stop_event=None):
+        """
+        Search the position and return a SearchResult.
+        With a time budget the search deepens iteratively up to `depth`
+        (or the end of the game) and keeps the last completed iteration.
+        stop_event: an Event that stops this search once set (default: a new one, set by stop()),
+        so a caller can stop a search it has not seen start yet.
+        """
+        # a token per search: a stop() arriving after the previous search ended cannot abort this one
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        depth = depth if depth is not None else self.depth
+        movetime = movetime if movetime is not None else self.movetime
+        if maximizing is None:
+            maximizing = side_to_move(board) == AI
+
+        board = board.copy()
+        valid_moves = board.get_valid_moves()
+        if not valid_moves:
+            raise ValueError("No valid moves available")
+        if self.algorithm == "mcts":
+            return self._search_mcts(board, movetime, maximizing, on_iteration)
+
+        self.stats = SearchStats()
+        self.root_moves = len(board.move_history)
+        if self.disk_cache is not None and board.geometry.key != DEFAULT_GEOMETRY.key:
+            raise ValueError("The disk cache only holds results of the standard board")
+        # checked here too: the options can be changed after construction (engine_cli setoption)
+        sampling = self.algorithm == "expectiminimax" and self.chance_samples is not None
+        if sampling and self.disk_cache is not None:
+            raise ValueError("Sampled expectiminimax does not support the disk cache")
+        if self.algorithm == "expectiminimax":  # rows are built lazily, per mask of full columns reached
+            self.outcome_table = build_outcome_table(*self.slip_probabilities, cols=board.cols)
+        owner = (self.algorithm, self.evaluation, self.slip_probabilities, board.geometry.key,
+                 self.chance_samples if sampling else None)
+        if self.tt is not None and self.tt.owner != owner:
+            self.tt.clear()
+            self.tt.owner = owner
+        if self.eval_cache is not None and self.eval_cache.owner != (self.evaluation, board.geometry.key):
+            self.eval_cache.clear()
+            self.eval_cache.owner = (self.evaluation, board.geometry.key)
+        self.caching = self.tt is not None or self.disk_cache is not None
+        self.variant = self.cache_variant() if self.disk_cache is not None else None
+        start_time = time.perf_counter()
+        self.deadline = start_time + movetime if movetime is not None else None
+
+        remaining = board.rows * board.cols - len(board.move_history)
+        if movetime is None:
+            depths = [depth]
+        else:
+            max_depth = min(depth, remaining) if depth is not None else remaining
+            depths = range(1, max(max_depth, 1) + 1)
+
+        self.tracer = ChromeTracer() if self.trace_dir is not None else None
+        search_span = self.tracer.span("search", "search", algorithm=self.algorithm, moves=len(board.move_history)) \
+            if self.tracer is not None else NULL_SPAN
+
+        best_score, best_col, completed_depth = None, valid_moves[0], 0
+        completed, bounds = True, None
+        with search_span:
+            for current_depth in depths:
+                iteration_span = self.tracer.span(f"depth {current_depth}", "iteration") \
+                    if self.tracer is not None else NULL_SPAN
+                try:
+                    with iteration_span:
+                        score, col = self._search_root(board, current_depth, maximizing)
+                except SearchAborted:
+                    completed = False
+                    break
+                best_score, best_col, completed_depth = score, col, current_depth
+                bounds, self.root_bounds = self.root_bounds, None
+                if on_iteration is not None:
+                    on_iteration(SearchResult(best_col, best_score, completed_depth, self.stats.nodes,
+                                              time.perf_counter() - start_time, stats=self.stats,
+                                              bounds=bounds))
+
+        elapsed = time.perf_counter() - start_time
+        self.stats.total_time = elapsed
+
+        trace_path = self._save_trace(board)
+        return SearchResult(best_col, best_score, completed_depth, self.stats.nodes,
+                            elapsed, completed, self.stats, trace_path, bounds)
+
+    def _save_trace(self, board):
+        """Write the search's trace to a new file in trace_dir, so repeated searches of a ply keep theirs"""
+        if self.tracer is None:
+            return None
+        os.makedirs(self.trace_dir, exist_ok=True)
+        prefix = os.path.join(self.trace_dir, f"move{len(board.move_history) + 1:02d}_{self.algorithm}")
+        sequence = 1
+        while True:
+            trace_path = f"{prefix}_{sequence}.json"
+            try:
+                self.tracer.save(trace_path, exclusive=True)  # claimed atomically, also against other processes
+                break
+            except FileExistsError:
+                sequence += 1
+        self.tracer = None
+        self.trace_root_depth = -1
+        return trace_path
+
+    def _search_mcts(self, board, movetime, maximizing, on_iteration):
+        """Monte Carlo tree search; depth is the deepest tree node and nodes the playouts run"""
+        self.stats = stats = SearchStats()
+        start_time = time.perf_counter()
+
+        def make_result(progress):
+            move, score, playouts, max_depth = progress
+            stats.nodes, stats.max_depth = playouts, max_depth
+            return SearchResult(move, score, max_depth, playouts, time.perf_counter() - start_time, stats=stats)
+
+        def report(progress):
+            on_iteration(make_result(progress))
+
+        self.tracer = ChromeTracer() if self.trace_dir is not None else None
+        with self.tracer.span("search", "search", algorithm=self.algorithm, moves=len(board.move_history)) \
+                if self.tracer is not None else NULL_SPAN:
+            progress = self.mcts.search(board, AI if maximizing else PLAYER, movetime, self.playouts,
+                                        self.stop_event, report if on_iteration is not None else None, self.tracer)
+        result = make_result(progress)
+        stats.total_time = result.elapsed
+        result.trace_path = self._save_trace(board)
+        if on_iteration is not None:
+            on_iteration(result)
+        return result
+
+    def _search_root(self, board, depth, maximizing):
+        if self.tracer is not None:
+            self.trace_root_depth = depth
+        if self.algorithm == "minimax":
+            return self._minimax(board, depth, maximizing)
+        if self.algorithm == "alpha_beta":
+            return self._alpha_beta(board, depth, -math.inf, math.inf, maximizing)
+        if self.chance_samples is not None and maximizing:
+            return self._sampled_root(board, depth)
+        if self.workers and depth >= 2:
+            return self._search_parallel_expecti(board, depth, maximizing)
+        return self._expectiminimax(board, depth, maximizing)
+
+    def _search_parallel_expecti(self, board, depth, maximizing):
+        """Search the outcome subtrees below the first parallel_levels chance levels on the pool"""
+        tasks = {}  # move history after the landing -> (board, depth); shared by colliding outcomes
+        cached = {}  # TT key -> (score, col) of the split nodes answered by the caches
+        self._expecti_split(board, depth, maximizing, self.parallel_levels, tasks, None, cached)
+        keys = list(tasks)
+        # the utils go along (custom ones included); worker engines are reused per evaluation fingerprint
+        options = (self._utils_fingerprint(), self.batch_leaves, self.delta_leaves,
+                   self.eval_cache.max_entries if self.eval_cache is not None else None, self.slip_probabilities,
+                   board.geometry.key)
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        pending = self.pool.map_async(_search_outcome,
+                                      [tasks[key] + (self.root_moves, self.utils, self.tracer is not None, options)
+                                       for key in keys])
+        while not pending.ready():
+            if self.stop_event.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline):
+                self.close()  # the workers cannot be interrupted, so drop the pool
+                raise SearchAborted()
+            pending.wait(0.01)
+        results = {}
+        for key, (value, stats, events) in zip(keys, pending.get()):
+            results[key] = value, stats
+            if events:
+                self.tracer.merge(events)  # the workers' subtree spans, on their own process rows
+        return self._expecti_split(board, depth, maximizing, self.parallel_levels, None, results, cached)
+
+    def _expecti_split(self, board, depth, is_ai_turn, levels, tasks, results, cached):
+        """
+        _expectiminimax down to the chance nodes `levels` chance levels deep, whose outcome
+        values come from `results` (the first pass only collects them into `tasks`).
+        Same move order, tie-breaking and summation order as the serial search. The first
+        pass probes the caches at every node and puts the hits in `cached`, so their
+        subtrees are not searched; the second pass stores the values it computes.
+        """
+        collecting = results is None
+        if not collecting:
+            self._visit(board)
+        if depth == 0 or board.is_full():
+            return (0.0 if collecting else self._evaluate(board)), None
+        if self.caching:
+            key = TranspositionTable.key(board, is_ai_turn)
+            if collecting:
+                hit = self._probe(key, depth, -math.inf, math.inf)
+                if hit is not None:
+                    cached[key] = hit
+                    return 0.0, None
+            elif key in cached:
+                return cached[key]
+        valid_moves = board.get_valid_moves() if collecting else self.stats.valid_moves(board)
+
+        if is_ai_turn:
+            best, best_col = -math.inf, None
+            for col in valid_moves:
+                if not collecting:
+                    self._visit(board)  # the chance node
+                expected_value = 0.0
+                for landing_col, prob in self.outcome_table[board.full_columns][col]:
+                    board.drop_piece(landing_col, AI)
+                    if levels > 1:
+                        value, _ = self._expecti_split(board, depth - 1, False, levels - 1, tasks, results, cached)
+                    elif collecting:
+                        tasks.setdefault(tuple(board.move_history), (board.copy(), depth - 1))
+                        value = 0.0
+                    else:
+                        value, stats = results[tuple(board.move_history)]
+                        self.stats.merge(stats)
+                    board.undo_move()
+                    expected_value += prob * value
+                if expected_value > best:
+                    best, best_col = expected_value, col
+        else:
+            best, best_col = math.inf, None
+            for col in valid_moves:
+                board.drop_piece(col, PLAYER)
+                value, _ = self._expecti_split(board, depth - 1, True, levels, tasks, results, cached)
+                board.undo_move()
+                if value < best:
+                    best, best_col = value, col
+        if self.caching and not collecting:
+            self._store(key, depth, best, EXACT, best_col)
+        return best, best_col
+
+    def _probe(self, key, depth, alpha, beta):
+        """(score, col) from the transposition table or the disk cache if usable in this window"""
+        stats = self.stats
+        if self.tt is not None:
+            stats.tt_probes += 1
+            entry = self.tt.probe(key, depth)
+            if entry is not None and self._usable(entry[0], entry[1], alpha, beta):
+                stats.tt_hits += 1
+                return entry[0], entry[2]
+        if self.disk_cache is not None and depth >= self.disk_cache_min_depth:
+            stats.disk_probes += 1
+            entry = self.disk_cache.probe(key, self.variant, depth)
+            if entry is not None and self._usable(entry[0], entry[1], alpha, beta):
+                stats.disk_hits += 1
+                if self.tt is not None:
+                    self.tt.store(key, depth, *entry)
+                return entry[0], entry[2]
+        return None
+
+    @staticmethod
+    def _usable(score, flag, alpha, beta):
+        return flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha)
+
+    def _store(self, key, depth, score, flag, best_col):
+        if self.tt is not None:
+            self.tt.store(key, depth, score, flag, best_col)
+            self.stats.tt_stores += 1
+        if self.disk_cache is not None and depth >= self.disk_cache_min_depth:
+            self.disk_cache.store(key, self.variant, depth, score, flag, best_col)
+            self.stats.disk_stores += 1
+
+    def _root_move_span(self, col):
+        return self.tracer.span(f"root col {col}", "root_move", col=col)
+
+    def _evaluate(self, board):
+        cache = self.eval_cache
+        if cache is not None:
+            score = cache.get(board.hash)
+            if score is not None:
+                self.stats.eval_cache_hits += 1
+                return score
+        if self.tracer is None:
+            score = self.stats.evaluate(self.utils, board)
+        else:
+            with self.tracer.span("evaluate_board", "eval"):
+                score = self.stats.evaluate(self.utils, board)
+        if cache is not None:
+            cache.put(board.hash, score)
+        return score
+
+    def _leaf_scores(self, board, cols, piece):
+        """Scores of the positions after dropping piece into each of cols, evaluated as one batch"""
+        if not getattr(self.utils, "batch_exact", False):
+            # an evaluate_board the batch and delta scoring cannot reproduce: score each child
+            scores = []
+            for col in cols:
+                board.drop_piece(col, piece)
+                scores.append(self._evaluate(board))
+                board.undo_move()
+            return scores
+        if self.delta_leaves:
+            base = self._evaluate(board)
+            deltas = self.utils.move_deltas(board, piece)
+            return [base + deltas[col] for col in cols]
+        cache = self.eval_cache
+        if cache is None:
+            missing = cols
+            scores = [None] * len(cols)
+        else:
+            heights = board.column_heights
+            zobrist = board.zobrist
+            keys = [board.hash ^ zobrist[piece][heights[col]][col] for col in cols]
+            scores = [cache.get(key) for key in keys]
+            missing = [col for col, score in zip(cols, scores) if score is None]
+            self.stats.eval_cache_hits += len(cols) - len(missing)
+        if missing:
+            children = batch_eval.child_positions(board, missing, piece)
+            if self.tracer is None:
+                values = iter(self.stats.evaluate_batch(self.utils, children, board.connect))
+            else:
+                with self.tracer.span("evaluate_batch", "eval", boards=len(missing)):
+                    values = iter(self.stats.evaluate_batch(self.utils, children, board.connect))
+            for i, score in enumerate(scores):
+                if score is None:
+                    scores[i] = next(values)
+                    if cache is not None:
+                        cache.put(keys[i], scores[i])
+        return scores
+
+    def _visit_leaf(self, board):
+        """Count a child leaf that was scored by _leaf_scores without being played"""
+        stats = self.stats
+        stats.record_node(len(board.move_history) + 1 - self.root_moves)
+        if stats.nodes % CHECK_INTERVAL == 0:
+            if self.stop_event.is_set():
+                raise SearchAborted()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchAborted()
+
+    def _visit(self, board):
+        stats = self.stats
+        stats.record_node(len(board.move_history) - self.root_moves)
+        if stats.nodes % CHECK_INTERVAL == 0:
+            if self.stop_event.is_set():
+                raise SearchAborted()
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchAborted()
+
+    # ------------------------------------------------------------------
+    # Searches (same move order and tie-breaking as minimaxx / abPruning / expecti)
+    # ------------------------------------------------------------------
+    def _minimax(self, board, depth, maximizing):
+        self._visit(board)
+
+        valid_moves = self.stats.valid_moves(board)
+        if depth == 0 or not valid_moves:
+            return self._evaluate(board), None
+
+        if self.caching:
+            key = TranspositionTable.key(board, maximizing)
+            cached = self._probe(key, depth, -math.inf, math.inf)
+            if cached is not None:
+                return cached
+
+        leaf_scores = None
+        if depth == 1 and (self.batch_leaves or self.delta_leaves):
+            leaf_scores = self._leaf_scores(board, valid_moves, AI if maximizing else PLAYER)
+
+        best_col = valid_moves[0]
+        if maximizing:
+            best = -math.inf
+            for i, col in enumerate(valid_moves):
+                if leaf_scores is not None:
+                    self._visit_leaf(board)
+                    score = leaf_scores[i]
+                else:
+                    with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                        board.drop_piece(col, AI)
+                        score, _ = self._minimax(board, depth - 1, False)
+                        board.undo_move()
+                if score > best:
+                    best, best_col = score, col
+        else:
+            best = math.inf
+            for i, col in enumerate(valid_moves):
+                if leaf_scores is not None:
+                    self._visit_leaf(board)
+                    score = leaf_scores[i]
+                else:
+                    with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                        board.drop_piece(col, PLAYER)
+                        score, _ = self._minimax(board, depth - 1, True)
+                        board.undo_move()
+                if score < best:
+                    best, best_col = score, col
+
+        if self.caching:
+            self._store(key, depth, best, EXACT, best_col)
+        return best, best_col
+
+    def _alpha_beta(self, board, depth, alpha, beta, maximizing):
+        self._visit(board)
+
+        valid_moves = self.stats.valid_moves(board)
+        if depth == 0 or not valid_moves:
+            return self._evaluate(board), None
+
+        if self.caching:
+            key = TranspositionTable.key(board, maximizing)
+            cached = self._probe(key, depth, alpha, beta)
+            if cached is not None:
+                return cached
+            alpha_orig, beta_orig = alpha, beta
+
+        if self.order_moves:
+            deltas = self.utils.move_deltas(board, AI if maximizing else PLAYER)
+            valid_moves = sorted(valid_moves, key=deltas.__getitem__, reverse=maximizing)
+
+        leaf_scores = None
+        if depth == 1 and (self.batch_leaves or self.delta_leaves):
+            leaf_scores = self._leaf_scores(board, valid_moves, AI if maximizing else PLAYER)
+
+        best_col = valid_moves[0]
+        if maximizing:
+            best = -math.inf
+            for i, col in enumerate(valid_moves):
+                if leaf_scores is not None:
+                    self._visit_leaf(board)
+                    score = leaf_scores[i]
+                else:
+                    with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                        board.drop_piece(col, AI)
+                        score, _ = self._alpha_beta(board, depth - 1, alpha, beta, False)
+                        board.undo_move()
+                if score > best:
+                    best, best_col = score, col
+                alpha = max(alpha, score)
+                if beta <= alpha:
+                    self.stats.record_cutoff(i)
+                    break
+        else:
+            best = math.inf
+            for i, col in enumerate(valid_moves):
+                if leaf_scores is not None:
+                    self._visit_leaf(board)
+                    score = leaf_scores[i]
+                else:
+                    with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                        board.drop_piece(col, PLAYER)
+                        score, _ = self._alpha_beta(board, depth - 1, alpha, beta, True)
+                        board.undo_move()
+                if score < best:
+                    best, best_col = score, col
+                beta = min(beta, score)
+                if beta <= alpha:
+                    self.stats.record_cutoff(i)
+                    break
+
+        if self.caching:
+            if best <= alpha_orig:
+                flag = UPPER
+            elif best >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self._store(key, depth, best, flag, best_col)
+        return best, best_col
+
+    def _expectiminimax(self, board, depth, is_ai_turn):
+        self._visit(board)
+
+        if depth == 0 or board.is_full():
+            return self._evaluate(board), None
+
+        if self.caching:
+            key = TranspositionTable.key(board, is_ai_turn)
+            cached = self._probe(key, depth, -math.inf, math.inf)
+            if cached is not None:
+                return cached
+
+        valid_moves = self.stats.valid_moves(board)
+        leaf_scores = None
+        if depth == 1 and (self.batch_leaves or self.delta_leaves):
+            # every landing column of every chance node is a valid move, so one batch covers them all
+            leaf_scores = dict(zip(valid_moves, self._leaf_scores(board, valid_moves, AI if is_ai_turn else PLAYER)))
+
+        if is_ai_turn:
+            best, best_col = -math.inf, None
+            for col in valid_moves:
+                with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                    value = self._chance(board, depth, col, leaf_scores)
+                if value > best:
+                    best, best_col = value, col
+        else:
+            best, best_col = math.inf, None
+            for col in valid_moves:
+                if leaf_scores is not None:
+                    self._visit_leaf(board)
+                    value = leaf_scores[col]
+                else:
+                    with self._root_move_span(col) if depth == self.trace_root_depth else NULL_SPAN:
+                        board.drop_piece(col, PLAYER)
+                        value, _ = self._expectiminimax(board, depth - 1, True)
+                        board.undo_move()
+                if value < best:
+                    best, best_col = value, col
+
+        if self.caching:
+            self._store(key, depth, best, EXACT, best_col)
+        return best, best_col
+
+    def _chance(self, board, depth, chosen_col, leaf_scores=None):
+        """
+        Expected value of the AI choosing chosen_col when the piece may slip to a neighbour.
+        leaf_scores (landing col -> score) holds the batched scores when the outcomes are leaves.
+        """
+        self._visit(board)
+        outcomes = self.outcome_table[board.full_columns][chosen_col]
+        if self.chance_samples is not None and leaf_scores is None:
+            values, draws = {}, []
+            for _ in range(self.chance_samples):
+                self._draw(board, depth, outcomes, values, draws)
+            return self._chance_estimate(outcomes, values, draws)[0]
+
+        expected_value = 0.0
+        for landing_col, prob in outcomes:
+            if leaf_scores is not None:
+                self._visit_leaf(board)
+                value = leaf_scores[landing_col]
+            else:
+                board.drop_piece(landing_col, AI)
+                value, _ = self._expectiminimax(board, depth - 1, False)
+                board.undo_move()
+            expected_value += prob * value
+        return expected_value
+
+    # ------------------------------------------------------------------
+    # Sampled expectiminimax
+    # ------------------------------------------------------------------
+    def _draw(self, board, depth, outcomes, values, draws):
+        """Sample one landing column; each distinct outcome is only searched once per chance node"""
+        r = self.rng.random()
+        for landing_col, prob in outcomes:
+            r -= prob
+            if r < 0:
+                break
+        if landing_col not in values:
+            board.drop_piece(landing_col, AI)
+            values[landing_col], _ = self._expectiminimax(board, depth - 1, False)
+            board.undo_move()
+        draws.append(values[landing_col])
+
+    @staticmethod
+    def _chance_estimate(outcomes, values, draws):
+        """
+        (expected value, confidence half-width) from the draws so far.
+        Once every outcome has been searched the exact expectation is known.
+        """
+        if len(values) == len(outcomes):
+            expected_value = 0.0
+            for landing_col, prob in outcomes:
+                expected_value += prob * values[landing_col]
+            return expected_value, 0.0
+        n = len(draws)
+        mean = sum(draws) / n
+        if len(values) < 2:
+            return mean, math.inf  # a single searched outcome says nothing about the spread
+        variance = sum((x - mean) ** 2 for x in draws) / (n - 1)
+        return mean, CONFIDENCE_Z * math.sqrt(variance / n)
+
+    def _sampled_root(self, board, depth):
+        """AI root of the sampled search; fills self.root_bounds"""
+        self._visit(board)
+        valid_moves = self.stats.valid_moves(board)
+        if depth == 0 or not valid_moves:
+            return self._evaluate(board), None
+
+        samples = {}  # col -> (outcomes, searched values, draws)
+        for col in valid_moves:
+            self._visit(board)  # the chance node
+            outcomes, values, draws = self.outcome_table[board.full_columns][col], {}, []
+            for _ in range(self.chance_samples):
+                self._draw(board, depth, outcomes, values, draws)
+            samples[col] = (outcomes, values, draws)
+        estimates = {col: self._chance_estimate(*samples[col]) for col in valid_moves}
+
+        while self.adaptive:
+            best_col = max(valid_moves, key=lambda c: estimates[c][0])
+            best_low = estimates[best_col][0] - estimates[best_col][1]
+            contenders = [col for col in valid_moves
+                          if col == best_col or estimates[col][0] + estimates[col][1] >= best_low]
+            if len(contenders) == 1:
+                break  # the bounds separate the best move
+            open_cols = [col for col in contenders
+                         if len(samples[col][2]) < self.root_samples and len(samples[col][1]) < len(samples[col][0])]
+            if not open_cols:
+                break
+            for col in open_cols:
+                self._draw(board, depth, *samples[col])
+                estimates[col] = self._chance_estimate(*samples[col])
+
+        best, best_col = -math.inf, None
+        for col in valid_moves:
+            if estimates[col][0] > best:
+                best, best_col = estimates[col][0], col
+        self.root_bounds = {col: (mean - half_width, mean + half_width)
+                            for col, (mean, half_width) in estimates.items()}
+        return best, best_col
@@ -0,0 +1,234 @@
+"""
+Line protocol front end for the headless Engine (UCI-style), e.g.
+
+    position startpos moves 3 3 4
+    setoption name algorithm value expectiminimax
+    setoption name trace_dir value traces     (Chrome trace JSON per search, "none" to disable)
+    setoption name disk_cache value c4.cache  (persistent result cache shared across sessions)
+    setoption name eval_cache value 262144    (leaf evaluation cache entries, 0 to disable)
+    setoption name chance_samples value 2     (sampled expectiminimax, "none" for the exact search)
+    setoption name adaptive value true        (sampled root keeps drawing until the best move separates)
+    setoption name slip value 0.6 0.2 0.4     (expectiminimax chosen / neighbour / edge neighbour probabilities)
+    setoption name geometry value 7 9 4       (rows, columns and connect length; resets the position)
+    go depth 6          |  go movetime 2000  |  go infinite
+    stop
+    quit
+
+Columns are 0-based and the human (piece 1) always moves first.
+The engine answers with `info ...` lines per completed iteration and a final `bestmove <col>`.
+"""
+from engine import Engine, ALGORITHMS, board_from_moves
+from disk_cache import DiskCache
+from eval_cache import EvalCache
+from board import Board
+from geometry import DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT
+import sys
+import threading
+
+
+class EngineProtocol:
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.out_lock = threading.Lock()
+        self.engine = Engine()
+        self.geometry = (DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT)  # rows, cols, connect of the boards set up
+        self.board = Board(*self.geometry)
+        self.search_thread = None
+        self.stop_event = threading.Event()  # of the search started by the last go
+        self.infinite = False  # that search only ends when stopped
+
+    def send(self, line):
+        with self.out_lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def handle(self, line):
+        """Handle one command line, returns False on quit"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "quit":
+            self.stop_search()
+            return False
+        elif command == "uci":
+            self.send("id name Connect4 Engine")
+            self.send(f"option name algorithm type combo default {self.engine.algorithm} "
+                      + " ".join(f"var {a}" for a in ALGORITHMS))
+            self.send(f"option name depth type spin default {self.engine.depth} min 1 max 42")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop_search()
+            self.board = Board(*self.geometry)
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "position":
+            self.set_position(args)
+        elif command == "go":
+            self.go(args)
+        elif command == "stop":
+            self.stop_search()
+        else:
+            self.send(f"info string unknown command: {command}")
+        return True
+
+    def set_option(self, args):
+        if len(args) < 4 or args[0] != "name" or "value" not in args:
+            self.send("info string usage: setoption name <name> value <value>")
+            return
+        split = args.index("value")
+        name = " ".join(args[1:split]).lower()
+        value = " ".join(args[split + 1:])
+        if name == "algorithm" and value in ALGORITHMS:
+            self.rebuild_engine(algorithm=value)
+        elif name == "depth" and value.isdigit() and int(value) >= 1:
+            self.engine.depth = int(value)
+        elif name == "disk_cache":
+            try:
+                cache = DiskCache(value) if value not in ("", "none") else None
+            except (OSError, ValueError) as e:
+                self.send(f"info string invalid option: {name} = {value} ({e})")
+            else:
+                self.rebuild_engine(disk_cache=cache)
+        elif name == "eval_cache" and value.isdigit():
+            self.engine.eval_cache = EvalCache(int(value)) if int(value) > 0 else None
+        elif name == "chance_samples" and (value.isdigit() or value == "none"):
+            self.engine.chance_samples = int(value) if value.isdigit() and int(value) > 0 else None
+        elif name == "adaptive" and value in ("true", "false"):
+            self.engine.adaptive = value == "true"
+        elif name == "slip":
+            try:
+                self.engine.set_slip_probabilities(*(float(p) for p in value.split()))
+            except (TypeError, ValueError) as e:
+                self.send(f"info string invalid option: {name} = {value} ({e})")
+        elif name == "geometry":
+            try:
+                board = Board(*(int(n) for n in value.split()))
+            except (TypeError, ValueError) as e:
+                self.send(f"info string invalid option: {name} = {value} ({e})")
+            else:
+                self.stop_search()
+                self.geometry = (board.rows, board.cols, board.connect)
+                self.board = board
+        elif name == "trace_dir":
+            self.engine.trace_dir = value if value not in ("", "none") else None
+        else:
+            self.send(f"info string invalid option: {name} = {value}")
+
+    def rebuild_engine(self, **options):
+        """
+        Replace the engine by a new one with these options changed and the others carried over,
+        so per-algorithm state (MCTS tree, worker pools) is built for the new settings.
+        The old engine's workers, and a disk cache no longer used, are closed.
+        """
+        self.stop_search()
+        old = self.engine
+        settings = dict(algorithm=old.algorithm, depth=old.depth, evaluation=old.evaluation,
+                        trace_dir=old.trace_dir, tt=old.tt, disk_cache=old.disk_cache, eval_cache=old.eval_cache,
+                        chance_samples=old.chance_samples, adaptive=old.adaptive,
+                        slip_probabilities=old.slip_probabilities)
+        settings.update(options)
+        try:
+            self.engine = Engine(**settings)
+        except ValueError as e:
+            if options.get("disk_cache") is not None:
+                options["disk_cache"].close()
+            self.send(f"info string {e}")
+            return
+        old.close()
+        if old.disk_cache is not None and old.disk_cache is not self.engine.disk_cache:
+            old.disk_cache.close()
+
+    def set_position(self, args):
+        moves = []
+        if "moves" in args:
+            moves = args[args.index("moves") + 1:]
+        elif args and args[0] != "startpos":
+            moves = list(args[0])  # compact digit string, e.g. "3343"
+        try:
+            self.board = board_from_moves(moves, *self.geometry)
+        except ValueError as e:
+            self.send(f"info string {e}")
+
+    def go(self, args):
+        self.stop_search()
+        if not self.board.get_valid_moves():
+            self.send("bestmove none")
+            return
+
+        try:
+            depth, movetime = self.parse_go(args)
+        except ValueError as e:
+            self.send(f"info string {e}")
+            return
+
+        self.stop_event = threading.Event()
+        self.infinite = movetime == float("inf")
+        self.search_thread = threading.Thread(target=self.run_search, args=(depth, movetime, self.stop_event),
+                                              daemon=True)
+        self.search_thread.start()
+
+    @staticmethod
+    def parse_go(args):
+        """(depth, movetime in seconds) of the go arguments; ValueError if malformed"""
+        def positive(name):
+            index = args.index(name) + 1
+            if index == len(args) or not args[index].isdigit() or int(args[index]) == 0:
+                raise ValueError(f"go {name} needs a positive whole number")
+            return int(args[index])
+
+        depth, movetime = None, None
+        if "depth" in args:
+            depth = positive("depth")
+        if "movetime" in args:
+            movetime = positive("movetime") / 1000.0
+        if "infinite" in args:
+            movetime = float("inf")
+        return depth, movetime
+
+    def run_search(self, depth, movetime, stop_event):
+        def report(result):
+            score = f"{result.score:.2f}" if isinstance(result.score, float) else result.score
+            self.send(f"info depth {result.depth} score {score} nodes {result.nodes} "
+                      f"nps {int(result.nps)} time {int(result.elapsed * 1000)} pv {result.move}")
+
+        if movetime is not None and depth is None:
+            depth = 42
+        try:
+            result = self.engine.search(self.board, depth=depth, movetime=movetime, on_iteration=report,
+                                        stop_event=stop_event)
+        except ValueError as e:  # an option combination the search refuses
+            self.send(f"info string {e}")
+            self.send("bestmove none")
+            return
+        self.send(f"bestmove {result.move}")
+
+    def wait(self):
+        if self.search_thread is not None:
+            self.search_thread.join()
+        self.search_thread = None
+
+    def stop_search(self):
+        if self.search_thread is not None:
+            self.stop_event.set()  # the token of that search only, so a late stop never reaches the next one
+            self.search_thread.join()
+        self.search_thread = None
+
+
+def main():
+    protocol = EngineProtocol()
+    for line in sys.stdin:
+        if not protocol.handle(line.strip()):
+            return
+    # end of input: let a pending search finish (stop an infinite one) and report its move
+    if protocol.infinite:
+        protocol.stop_search()
+    else:
+        protocol.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Leaf evaluation cache shared by the Engine searches.
+
+The same leaf is reached through different move orders (in expectiminimax constantly,
+since neighbouring landing columns collide), so each position is scored only once.
+Scores depend only on the pieces, so the key is the board's Zobrist hash. Memory stays
+bounded on long runs: beyond max_entries the least recently used score is dropped.
+"""
+from collections import OrderedDict
+
+
+class EvalCache:
+    def __init__(self, max_entries=1 << 18):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # hash -> score, least recently used first
+        self.owner = None  # (evaluation, board geometry) the scores were computed with
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        """Cached score or None"""
+        score = self.entries.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key, score):
+        entries = self.entries
+        entries[key] = score
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def to_dict(self):
+        return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate, "evictions": self.evictions}
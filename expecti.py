@@ -1,5 +1,6 @@
 from board import Board
 from TreeNode import TreeNode, print_tree ,print_board_state, print_tree_node
+from functools import lru_cache
 import math
 
 EMPTY = 0
@@ -14,6 +15,64 @@ PROB_CHOSEN = 0.6
 PROB_NEIGHBOR = 0.2
 PROB_EDGE_NEIGHBOR = 0.4
 
+
+OUTCOME_ROWS = 1 << 12  # full-column masks kept per outcome table
+
+
+def check_slip_probabilities(prob_chosen, prob_neighbor, prob_edge_neighbor):
+    if abs(prob_chosen + 2 * prob_neighbor - 1.0) > 1e-9 or abs(prob_chosen + prob_edge_neighbor - 1.0) > 1e-9:
+        raise ValueError("Slip probabilities must sum to 1 (chosen + 2 * neighbour and chosen + edge neighbour)")
+
+
+class OutcomeTable(dict):
+    """
+    Chance outcomes of the slip model on a board of cols columns, for a mask of full columns
+    (Board.full_columns) and a chosen column: table[full_columns][chosen_col] = ((landing col, probability), ...)
+    A mask's row is built when it is first looked up, and beyond max_rows the oldest row is
+    dropped, so wide boards never build all 2^cols of them.
+    """
+    def __init__(self, prob_chosen=PROB_CHOSEN, prob_neighbor=PROB_NEIGHBOR, prob_edge_neighbor=PROB_EDGE_NEIGHBOR,
+                 cols=COLS, max_rows=OUTCOME_ROWS):
+        super().__init__()
+        check_slip_probabilities(prob_chosen, prob_neighbor, prob_edge_neighbor)
+        self.probabilities = (prob_chosen, prob_neighbor, prob_edge_neighbor)
+        self.cols = cols
+        self.max_rows = max_rows
+
+    def __missing__(self, full_columns):
+        prob_chosen, prob_neighbor, prob_edge_neighbor = self.probabilities
+        cols = self.cols
+        row = []
+        for chosen_col in range(cols):
+            left_valid = chosen_col > 0 and not full_columns >> (chosen_col - 1) & 1
+            right_valid = chosen_col < cols - 1 and not full_columns >> (chosen_col + 1) & 1
+            if left_valid and right_valid:
+                outcomes = ((chosen_col, prob_chosen), (chosen_col - 1, prob_neighbor), (chosen_col + 1, prob_neighbor))
+            elif left_valid:
+                outcomes = ((chosen_col, prob_chosen), (chosen_col - 1, prob_edge_neighbor))
+            elif right_valid:
+                outcomes = ((chosen_col, prob_chosen), (chosen_col + 1, prob_edge_neighbor))
+            else:
+                outcomes = ((chosen_col, 1.0),)
+            row.append(outcomes)
+        if len(self) >= self.max_rows:
+            self.pop(next(iter(self)), None)  # the oldest row
+        row = self[full_columns] = tuple(row)
+        return row
+
+    def __reduce__(self):
+        return OutcomeTable, self.probabilities + (self.cols, self.max_rows)  # rows are rebuilt on demand
+
+
+@lru_cache(maxsize=32)
+def build_outcome_table(prob_chosen=PROB_CHOSEN, prob_neighbor=PROB_NEIGHBOR, prob_edge_neighbor=PROB_EDGE_NEIGHBOR,
+                        cols=COLS):
+    """The OutcomeTable of a slip model and board width, shared within the process"""
+    return OutcomeTable(prob_chosen, prob_neighbor, prob_edge_neighbor, cols)
+
+
+OUTCOMES = build_outcome_table()
+
 def expectiminimax(board, depth, is_ai_turn, utils, root_call=True):
     """Expectiminimax with tree visualization"""
     if root_call:
@@ -92,23 +151,7 @@ def _calculate_expected_value_tree(board, depth, chosen_col, utils, current_dept
     chance_node = TreeNode("CHANCE", current_depth, col=chosen_col)
     total_expected_value = 0.0
     
-    outcomes = []
-    
-    left_valid = (chosen_col > 0) and board.is_valid_location(chosen_col - 1)
-    right_valid = (chosen_col < COLS - 1) and board.is_valid_location(chosen_col + 1)
-
-    if left_valid and right_valid:
-        outcomes.append((chosen_col, PROB_CHOSEN))
-        outcomes.append((chosen_col - 1, PROB_NEIGHBOR))
-        outcomes.append((chosen_col + 1, PROB_NEIGHBOR))
-    elif left_valid:
-        outcomes.append((chosen_col, PROB_CHOSEN))
-        outcomes.append((chosen_col - 1, PROB_EDGE_NEIGHBOR))
-    elif right_valid:
-        outcomes.append((chosen_col, PROB_CHOSEN))
-        outcomes.append((chosen_col + 1, PROB_EDGE_NEIGHBOR))
-    else:
-        outcomes.append((chosen_col, 1.0))
+    outcomes = build_outcome_table(cols=board.cols)[board.full_columns][chosen_col]
 
     # Calculate weighted average
     for landing_col, prob in outcomes:
@@ -130,7 +173,7 @@ def _calculate_expected_value_tree(board, depth, chosen_col, utils, current_dept
     return total_expected_value, chance_node
 # Replace both functions with these versions
 
-def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_played=None, prob=1.0, node_counter=None):
+def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_played=None, prob=1.0, node_counter=None, stats=None):
     if node_counter is None:
         node_counter = [0]  # mutable counter
 
@@ -144,6 +187,8 @@ def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_playe
 
     # increment node count for this node
     node_counter[0] += 1
+    if stats is not None:
+        stats.record_node(indent_level)
 
     # Node type
     if is_ai_turn:
@@ -160,11 +205,11 @@ def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_playe
 
     # Terminal state
     if depth == 0 or board.is_full():
-        score = utils.evaluate_board(board)
+        score = stats.evaluate(utils, board) if stats is not None else utils.evaluate_board(board)
         print(f"{indent}└─ LEAF: Score = {score:.2f}")
         return score, None, node_counter[0]
 
-    valid_moves = board.get_valid_moves()
+    valid_moves = stats.valid_moves(board) if stats is not None else board.get_valid_moves()
 
     # ----------------------------
     # MAX NODE (AI)
@@ -180,7 +225,7 @@ def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_playe
             print(f"{indent}├─► Trying column {col} ({i+1}/{len(valid_moves)}) → CHANCE NODE")
 
             expected_value, _, _ = evaluate_chance_node_with_tree(
-                board, depth, col, utils, indent_level + 1, node_counter
+                board, depth, col, utils, indent_level + 1, node_counter, stats
             )
 
             print(f"{indent}│  ← Expected value from CHANCE({col}) = {expected_value:.2f}")
@@ -207,7 +252,7 @@ def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_playe
 
             board.drop_piece(col, PLAYER)
 
-            val, _, _ = expecti_with_tree(board, depth - 1, True, utils, indent_level + 1, col, 1.0, node_counter)
+            val, _, _ = expecti_with_tree(board, depth - 1, True, utils, indent_level + 1, col, 1.0, node_counter, stats)
 
             board.undo_move()
 
@@ -224,38 +269,17 @@ def expecti_with_tree(board, depth, is_ai_turn, utils, indent_level=0, col_playe
 # -----------------------------------------------------
 # CHANCE NODE HANDLER (now returns (expected_value, _, nodes))
 # -----------------------------------------------------
-def evaluate_chance_node_with_tree(board, depth, chosen_col, utils, indent_level, node_counter):
+def evaluate_chance_node_with_tree(board, depth, chosen_col, utils, indent_level, node_counter, stats=None):
     indent = "  " * indent_level
 
     # increment for chance node itself
     node_counter[0] += 1
+    if stats is not None:
+        stats.record_node(indent_level)
 
     print(f"{indent}┌─ CHANCE Node at Level {indent_level} | For chosen col = {chosen_col}")
 
-    outcomes = []
-
-    # Check neighbors
-    left_valid = chosen_col > 0 and board.is_valid_location(chosen_col - 1)
-    right_valid = chosen_col < COLS - 1 and board.is_valid_location(chosen_col + 1)
-
-    if left_valid and right_valid:
-        outcomes = [
-            (chosen_col, PROB_CHOSEN),
-            (chosen_col - 1, PROB_NEIGHBOR),
-            (chosen_col + 1, PROB_NEIGHBOR),
-        ]
-    elif left_valid:
-        outcomes = [
-            (chosen_col, PROB_CHOSEN),
-            (chosen_col - 1, PROB_EDGE_NEIGHBOR),
-        ]
-    elif right_valid:
-        outcomes = [
-            (chosen_col, PROB_CHOSEN),
-            (chosen_col + 1, PROB_EDGE_NEIGHBOR),
-        ]
-    else:
-        outcomes = [(chosen_col, 1.0)]
+    outcomes = build_outcome_table(cols=board.cols)[board.full_columns][chosen_col]
 
     # Display available outcomes
     for c, p in outcomes:
@@ -272,7 +296,7 @@ def evaluate_chance_node_with_tree(board, depth, chosen_col, utils, indent_level
         board.drop_piece(landing_col, AI)
 
         val, _, _ = expecti_with_tree(
-            board, depth - 1, False, utils, indent_level + 1, landing_col, prob, node_counter
+            board, depth - 1, False, utils, indent_level + 1, landing_col, prob, node_counter, stats
         )
 
         board.undo_move()
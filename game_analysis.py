@@ -0,0 +1,217 @@
+"""
+Post-game analysis: replay a finished game's move history and search every position
+again, deeper than in play, on a process pool.
+
+    python game_analysis.py 3343221... --depth 6 --workers 4
+
+    for move in analyse_game(board.move_history, depth=6):   # in the order they complete
+        print(move.ply, move.played, move.best_move, move.loss, move.blunder)
+
+For every ply the position before the move is searched at `depth` (best move and its
+score) and the position after the played move at depth - 1 (score of the played move),
+all positions at once. A move that is more than `threshold` worse than the best one, for
+the side that played it, is a blunder. Scores are the engine's, from the AI's point of
+view.
+
+With expectiminimax the move history holds the columns the AI's pieces landed in, not
+the ones it chose, so an AI move is only judged when its chosen column is passed in
+`chosen` (then the played score is that column's chance value, like the best score);
+otherwise its played score and loss are None and it is never flagged.
+
+The workers share one DiskCache file (a temporary one unless a path is given), so
+results found for one position are reused by the others, and every worker keeps its
+own transposition table between the positions it is given.
+"""
+from engine import Engine, EVALUATORS, board_from_moves, AI, PLAYER
+from board import Board
+from geometry import get_geometry, DEFAULT_GEOMETRY, DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT
+from stats import SearchStats
+from expecti import build_outcome_table
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+DEFAULT_DEPTH = 6
+BLUNDER_THRESHOLD = 100  # score loss that makes a move a blunder (an open three is worth 100)
+WORKER_TT_SIZE = 1 << 18
+
+ANALYSED_ALGORITHMS = ("minimax", "alpha_beta", "expectiminimax")
+
+
+class MoveAnalysis:
+    """Engine verdict on one move of a game"""
+    def __init__(self, ply, piece, played, best_move, best_score, played_score, stats, threshold):
+        self.ply = ply  # 0-based index into the move history
+        self.piece = piece  # who played it
+        self.played = played
+        self.best_move = best_move
+        self.best_score = best_score
+        self.played_score = played_score
+        self.stats = stats  # SearchStats of both searches (disk cache use included)
+        self.nodes = stats.nodes
+        # how much worse the played move is for its player (the human minimises the AI's score);
+        # None when the played move could not be judged
+        if played_score is None:
+            self.loss = None
+        else:
+            self.loss = best_score - played_score if piece == AI else played_score - best_score
+        self.blunder = self.loss is not None and self.loss > threshold
+
+    def to_dict(self):
+        return {
+            "ply": self.ply,
+            "piece": self.piece,
+            "played": self.played,
+            "best_move": self.best_move,
+            "best_score": self.best_score,
+            "played_score": self.played_score,
+            "loss": self.loss,
+            "blunder": self.blunder,
+            "nodes": self.nodes,
+        }
+
+
+# ----------------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------------
+_worker_engine = None
+
+
+def _init_worker(algorithm, evaluation, disk_cache):
+    global _worker_engine
+    _worker_engine = Engine(algorithm, evaluation=evaluation, tt_size=WORKER_TT_SIZE, disk_cache=disk_cache)
+
+
+def _search_position(task):
+    """
+    (kind, ply, best move, score, SearchStats) of the position after `moves`, or with a
+    chosen_col the chance value of the AI choosing it there (expectiminimax)
+    """
+    kind, ply, moves, depth, geometry, chosen_col = task
+    board = board_from_moves(moves, *geometry)
+    if chosen_col is None:
+        return (kind, ply) + _value(board, depth)
+    # summed in outcome order, exactly like the engine's chance nodes
+    engine = _worker_engine
+    outcomes = build_outcome_table(*engine.slip_probabilities, cols=board.cols)[board.full_columns][chosen_col]
+    expected_value, stats = 0.0, SearchStats()
+    for landing_col, prob in outcomes:
+        board.drop_piece(landing_col, AI)
+        _, value, outcome_stats = _value(board, depth - 1)
+        board.undo_move()
+        expected_value += prob * value
+        stats.merge(outcome_stats)
+    return kind, ply, chosen_col, expected_value, stats
+
+
+def _value(board, depth):
+    if not board.get_valid_moves():  # the last move filled the board
+        return None, _worker_engine.utils.evaluate_board(board), SearchStats()
+    result = _worker_engine.search(board, depth=depth)
+    return result.move, result.score, result.stats
+
+
+def analyse_game(moves, depth=DEFAULT_DEPTH, algorithm="alpha_beta", evaluation="default", workers=None,
+                 threshold=BLUNDER_THRESHOLD, disk_cache=None, rows=DEFAULT_ROWS, cols=DEFAULT_COLS,
+                 connect=DEFAULT_CONNECT, chosen=None):
+    """
+    Generator of the MoveAnalysis of every move of a game (a Board, or its move history as a
+    list or digit string), yielded as soon as the searches of the move are done.
+    chosen: the column chosen at every ply (expectiminimax, where AI pieces may slip).
+    """
+    if algorithm not in ANALYSED_ALGORITHMS:
+        raise ValueError(f"Post-game analysis needs a depth-limited algorithm, not {algorithm}")
+    if evaluation not in EVALUATORS:
+        # checked here: an initializer that raises makes the pool respawn its workers forever
+        raise ValueError(f"Unknown evaluation: {evaluation}")
+    if depth < 2:
+        raise ValueError("Post-game analysis needs a depth of at least 2")
+    if isinstance(moves, Board):
+        rows, cols, connect = moves.rows, moves.cols, moves.connect
+        moves = moves.move_history
+    moves = [int(col) for col in moves]
+    geometry = (rows, cols, connect)
+    board_from_moves(moves, *geometry)  # reject illegal games before starting the pool
+    if chosen is not None:
+        chosen = [int(col) for col in chosen]
+        if len(chosen) != len(moves):
+            raise ValueError(f"{len(chosen)} chosen columns for {len(moves)} moves")
+
+    tasks = []
+    searches = {}  # ply -> number of searches it needs
+    for ply in range(len(moves)):
+        tasks.append(("best", ply, moves[:ply], depth, geometry, None))
+        searches[ply] = 2
+        if algorithm == "expectiminimax" and ply % 2 == 1:
+            if chosen is None:
+                searches[ply] = 1  # the landing column alone says nothing about the AI's decision
+            else:
+                tasks.append(("played", ply, moves[:ply], depth, geometry, chosen[ply]))
+        else:
+            tasks.append(("played", ply, moves[:ply + 1], depth - 1, geometry, None))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        if get_geometry(*geometry).key != DEFAULT_GEOMETRY.key:
+            disk_cache = None  # the disk cache only holds standard boards; the per-worker tables still apply
+        elif disk_cache is None:
+            disk_cache = os.path.join(scratch, "analysis.cache")
+        with multiprocessing.Pool(workers or os.cpu_count() or 1, initializer=_init_worker,
+                                  initargs=(algorithm, evaluation, disk_cache)) as pool:
+            found = {}  # ply -> {"best" / "played": (move, score, stats)} until all are in
+            for kind, ply, move, score, stats in pool.imap_unordered(_search_position, tasks):
+                found.setdefault(ply, {})[kind] = (move, score, stats)
+                if len(found[ply]) < searches[ply]:
+                    continue
+                results = found.pop(ply)
+                best_move, best_score, stats = results["best"]
+                played_score = None
+                if "played" in results:
+                    _, played_score, played_stats = results["played"]
+                    stats.merge(played_stats)
+                piece = AI if ply % 2 == 1 else PLAYER
+                played = chosen[ply] if chosen is not None else moves[ply]
+                yield MoveAnalysis(ply, piece, played, best_move, best_score, played_score, stats, threshold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search every position of a finished game and flag blunders")
+    parser.add_argument("moves", help="the game's columns as a digit string, human first (e.g. 3343...)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--algorithm", default="alpha_beta", choices=ANALYSED_ALGORITHMS)
+    parser.add_argument("--evaluation", default="default", choices=list(EVALUATORS))
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    parser.add_argument("--threshold", type=float, default=BLUNDER_THRESHOLD, help="score loss of a blunder")
+    parser.add_argument("--disk-cache", default=None, help="persistent DiskCache file to share and keep")
+    parser.add_argument("--chosen", default=None,
+                        help="expectiminimax: the columns chosen at every ply, where they differ from the landings")
+    parser.add_argument("--geometry", type=int, nargs=3, default=(DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT),
+                        metavar=("ROWS", "COLS", "CONNECT"))
+    args = parser.parse_args()
+
+    results = []
+    for move in analyse_game(args.moves, args.depth, args.algorithm, args.evaluation, args.workers,
+                             args.threshold, args.disk_cache, *args.geometry, chosen=args.chosen):
+        results.append(move)
+        who = "AI   " if move.piece == AI else "Human"
+        if move.loss is None:
+            print(f"ply {move.ply + 1:2} {who} landed in {move.played} best {move.best_move} "
+                  f"score {move.best_score:.2f} (chosen column unknown, not judged)", flush=True)
+            continue
+        flag = "  BLUNDER" if move.blunder else ""
+        print(f"ply {move.ply + 1:2} {who} played {move.played} best {move.best_move} "
+              f"score {move.played_score:.2f} vs {move.best_score:.2f} loss {move.loss:.2f}{flag}", flush=True)
+
+    blunders = sorted((move for move in results if move.blunder), key=lambda move: move.ply)
+    print(f"\n{len(results)} moves analysed at depth {args.depth}, {len(blunders)} blunders")
+    stores = sum(move.stats.disk_stores for move in results)
+    if stores:
+        hits = sum(move.stats.disk_hits for move in results)
+        print(f"Shared disk cache: {hits} hits, {stores} stores")
+    for move in blunders:
+        who = "AI" if move.piece == AI else "Human"
+        print(f"  ply {move.ply + 1}: {who} played {move.played}, {move.best_move} was better by {move.loss:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Board geometries: number of rows, number of columns and how many in a row make a window.
+
+Every table that depends on the board size is generated once per geometry and cached
+by get_geometry, so boards, evaluators and engines of the same size share them:
+
+    geometry = get_geometry(rows=7, cols=9, connect=4)
+    geometry.windows          # every window as a tuple of (row, col) cells
+    geometry.windows_through  # [row][col] -> ((window cells, index of the cell), ...)
+    geometry.zobrist          # [piece][row][col] -> 64-bit key
+    geometry.shifts           # bitboard shifts of the four directions (see mcts)
+"""
+from functools import lru_cache
+import random
+
+DEFAULT_ROWS = 6
+DEFAULT_COLS = 7
+DEFAULT_CONNECT = 4
+
+ZOBRIST_SEED = 20240611
+
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))  # horizontal, vertical, both diagonals
+
+
+class Geometry:
+    """Dimensions of a board and the tables generated for them"""
+
+    def __init__(self, rows, cols, connect):
+        if rows < 1 or cols < 1:
+            raise ValueError(f"Board must have at least one row and one column, got {rows}x{cols}")
+        if not 2 <= connect <= max(rows, cols):
+            raise ValueError(f"Connect length {connect} does not fit a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.connect = connect
+        self.center_col = cols // 2
+
+        # Windows in the order score_position walks them: horizontal, vertical,
+        # diagonal (r + i, c + i) and anti-diagonal (r + i, c - i)
+        windows = []
+        through = [[[] for _ in range(cols)] for _ in range(rows)]
+        for dr, dc in DIRECTIONS:
+            for r0 in range(rows):
+                for c0 in range(cols):
+                    r1 = r0 + (connect - 1) * dr
+                    c1 = c0 + (connect - 1) * dc
+                    if not (0 <= r1 < rows and 0 <= c1 < cols):
+                        continue
+                    cells = tuple((r0 + i * dr, c0 + i * dc) for i in range(connect))
+                    windows.append(cells)
+                    for i, (r, c) in enumerate(cells):
+                        through[r][c].append((cells, i))
+        self.windows = tuple(windows)
+        self.windows_through = tuple(tuple(tuple(cell) for cell in row) for row in through)
+
+        # The standard board keeps the original seed so existing hashes (and disk caches) stay valid
+        if (rows, cols) == (DEFAULT_ROWS, DEFAULT_COLS):
+            seed = ZOBRIST_SEED
+        else:
+            seed = ZOBRIST_SEED * 1_000_003 + rows * 1000 + cols
+        zobrist_random = random.Random(seed)
+        self.zobrist = [[[zobrist_random.getrandbits(64) for c in range(cols)] for r in range(rows)]
+                        for piece in range(3)]
+
+        # Bitboards: bit col * height + row, with one spare (always empty) bit on top of
+        # every column so shifted runs never wrap into the next column
+        self.height = rows + 1
+        self.shifts = (1, self.height, self.height + 1, self.height - 1)  # vertical, horizontal, diagonals
+
+    @property
+    def key(self):
+        return (self.rows, self.cols, self.connect)
+
+    def __reduce__(self):
+        # Unpickle through the cache so worker processes share one instance per geometry
+        return get_geometry, self.key
+
+    def __repr__(self):
+        return f"Geometry(rows={self.rows}, cols={self.cols}, connect={self.connect})"
+
+
+def get_geometry(rows=DEFAULT_ROWS, cols=DEFAULT_COLS, connect=DEFAULT_CONNECT):
+    """The (cached) Geometry for a board of rows x cols where connect in a row score"""
+    # always cached under the positional key, however the arguments were given
+    return _cached_geometry(int(rows), int(cols), int(connect))
+
+
+@lru_cache(maxsize=None)
+def _cached_geometry(rows, cols, connect):
+    return Geometry(rows, cols, connect)
+
+
+DEFAULT_GEOMETRY = get_geometry(DEFAULT_ROWS, DEFAULT_COLS, DEFAULT_CONNECT)
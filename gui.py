@@ -1,29 +1,43 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from board import Board, empty, player, AI, rows, cols
+from board import Board, empty, player, AI, rows, cols, connect
 from MinimaxUtils import *
 from minimaxx import *
 from abPruning import *
 from expecti import *
+from stats import SearchStats, TimedStringIO
+from engine import Engine, batch_eval
+from pondering import Ponderer
 import time
 import sys
 from io import StringIO
+from collections import deque
 
 
 class Connect4GUI:
-    def __init__(self, root):
+    TERMINAL_CHUNK_LINES = 200  # lines inserted per event-loop tick
+
+    def __init__(self, root, terminal_max_lines=2000, terminal_log_path="connect4_terminal.log",
+                 rows=rows, cols=cols, connect=connect):
         self.root = root
         self.root.title("Connect 4 - AI Assignment")
         self.root.configure(bg='#f0f0f0')
 
         # Game state
-        self.board = Board()
+        self.rows, self.cols, self.connect = rows, cols, connect
+        self.board = Board(rows, cols, connect)
         self.utils = MinimaxUtils()
         self.game_over = False
         self.current_player = player  # Human starts
         self.selected_algorithm = tk.StringVar(value="minimax")
         self.game_started = False
         self.depth = tk.IntVar(value=4)
+        self.mcts_time = tk.DoubleVar(value=2.0)  # seconds per move for Monte Carlo tree search
+
+        # Headless engine kept between moves (transposition table + pondering)
+        self.reuse_search = tk.BooleanVar(value=False)
+        self.engine = None
+        self.ponderer = None
 
         # Scores
         self.player_fours = 0
@@ -37,9 +51,20 @@ class Connect4GUI:
 
         # Cell size
         self.cell_size = 70
+        self.cell_items = None  # canvas oval id per board cell
+
+        # Terminal ring buffer: the widget never holds more than
+        # terminal_max_lines lines, large messages are drained in chunks
+        self.terminal_max_lines = terminal_max_lines
+        self.terminal_queue = deque()
+        self.terminal_drain_scheduled = False
+        self.terminal_log_path = terminal_log_path
+        self.terminal_log_file = None
+        self.save_log = tk.BooleanVar(value=False)
 
         # Setup UI
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def setup_ui(self):
         # Main container
@@ -55,8 +80,8 @@ class Connect4GUI:
         board_frame.pack(side=tk.LEFT, padx=(0, 10))
 
         # Canvas for the board
-        canvas_width = cols * self.cell_size
-        canvas_height = rows * self.cell_size
+        canvas_width = self.cols * self.cell_size
+        canvas_height = self.rows * self.cell_size
         self.canvas = tk.Canvas(
             board_frame,
             width=canvas_width,
@@ -98,7 +123,8 @@ class Connect4GUI:
         algorithms = [
             ("Minimax (No Pruning)", "minimax"),
             ("Alpha-Beta Pruning", "alpha_beta"),
-            ("Expectiminimax", "expectiminimax")
+            ("Expectiminimax", "expectiminimax"),
+            ("Monte Carlo Tree Search", "mcts")
         ]
 
         for text, value in algorithms:
@@ -137,6 +163,40 @@ class Connect4GUI:
         )
         depth_spinbox.pack(side=tk.LEFT, padx=10)
 
+        # Time budget for Monte Carlo tree search (it has no depth)
+        mcts_frame = tk.Frame(menu_frame, bg='white')
+        mcts_frame.pack(pady=(0, 10), padx=20, fill=tk.X)
+
+        mcts_label = tk.Label(
+            mcts_frame,
+            text="MCTS Time (s):",
+            font=('Arial', 11, 'bold'),
+            bg='white'
+        )
+        mcts_label.pack(side=tk.LEFT)
+
+        mcts_spinbox = tk.Spinbox(
+            mcts_frame,
+            from_=0.5,
+            to=30,
+            increment=0.5,
+            textvariable=self.mcts_time,
+            width=5,
+            font=('Arial', 10)
+        )
+        mcts_spinbox.pack(side=tk.LEFT, padx=10)
+
+        reuse_check = tk.Checkbutton(
+            menu_frame,
+            text="Reuse search & ponder (no tree output)",
+            variable=self.reuse_search,
+            font=('Arial', 10),
+            bg='white',
+            activebackground='white',
+            command=self.on_reuse_search_change
+        )
+        reuse_check.pack(anchor=tk.W, padx=20)
+
         # Buttons
         button_frame = tk.Frame(menu_frame, bg='white')
         button_frame.pack(pady=20, padx=20, fill=tk.X)
@@ -224,18 +284,59 @@ class Connect4GUI:
         )
         self.score_label.pack(anchor=tk.W, padx=10)
 
+        # Search statistics (collapsible)
+        stats_frame = tk.Frame(menu_frame, bg='white')
+        stats_frame.pack(pady=10, padx=20, fill=tk.X)
+
+        self.stats_visible = False
+        self.stats_toggle = tk.Button(
+            stats_frame,
+            text="▶ Search Statistics",
+            command=self.toggle_stats_panel,
+            font=('Arial', 11, 'bold'),
+            bg='white',
+            activebackground='white',
+            relief=tk.FLAT,
+            cursor='hand2'
+        )
+        self.stats_toggle.pack(anchor=tk.W)
+
+        self.stats_label = tk.Label(
+            stats_frame,
+            text="No AI move yet",
+            font=('Courier', 9),
+            bg='white',
+            justify=tk.LEFT,
+            anchor=tk.W,
+            wraplength=320
+        )
+
         # Terminal (bottom)
         terminal_frame = tk.Frame(main_frame, bg='white', relief=tk.SUNKEN, borderwidth=2)
         terminal_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True, pady=(10, 0))
 
+        terminal_header = tk.Frame(terminal_frame, bg='white')
+        terminal_header.pack(fill=tk.X)
+
         terminal_label = tk.Label(
-            terminal_frame,
+            terminal_header,
             text="Console Output (Tree Visualization):",
             font=('Arial', 11, 'bold'),
             bg='white',
             anchor=tk.W
         )
-        terminal_label.pack(fill=tk.X, padx=5, pady=5)
+        terminal_label.pack(side=tk.LEFT, padx=5, pady=5)
+
+        save_log_check = tk.Checkbutton(
+            terminal_header,
+            text=f"Save full log to {self.terminal_log_path}",
+            variable=self.save_log,
+            font=('Arial', 9),
+            bg='white',
+            activebackground='white',
+            command=self.on_save_log_change
+        )
+        save_log_check.pack(side=tk.RIGHT, padx=5, pady=5)
 
         self.terminal = scrolledtext.ScrolledText(
             terminal_frame,
@@ -254,37 +355,43 @@ class Connect4GUI:
         self.add_terminal_message("Tree will be displayed in console for each AI move.")
 
     def draw_board(self):
-        """Draw the Connect 4 board with pieces"""
-        self.canvas.delete("all")
-
-        # Draw grid and pieces
-        for row in range(rows):
-            for col in range(cols):
-                # FLIP the visual representation: row 0 at bottom
-                visual_row = rows - 1 - row
-
-                x1 = col * self.cell_size
-                y1 = visual_row * self.cell_size
-                x_center = x1 + self.cell_size // 2
-                y_center = y1 + self.cell_size // 2
-                radius = self.cell_size // 2 - 5
-
-                # Get piece from board
-                piece = self.board.board[row][col]
-                if piece == player:
-                    color = self.RED
-                elif piece == AI:
-                    color = self.YELLOW
-                else:
-                    color = self.EMPTY_COLOR
-
-                self.canvas.create_oval(
-                    x_center - radius, y_center - radius,
-                    x_center + radius, y_center + radius,
-                    fill=color,
-                    outline='black',
-                    width=2
-                )
+        """Draw the Connect 4 board with pieces (creates the cells once, then only recolors them)"""
+        if self.cell_items is None:
+            self.cell_items = [[None] * self.cols for _ in range(self.rows)]
+
+            for row in range(self.rows):
+                for col in range(self.cols):
+                    # FLIP the visual representation: row 0 at bottom
+                    visual_row = self.rows - 1 - row
+
+                    x1 = col * self.cell_size
+                    y1 = visual_row * self.cell_size
+                    x_center = x1 + self.cell_size // 2
+                    y_center = y1 + self.cell_size // 2
+                    radius = self.cell_size // 2 - 5
+
+                    self.cell_items[row][col] = self.canvas.create_oval(
+                        x_center - radius, y_center - radius,
+                        x_center + radius, y_center + radius,
+                        fill=self.EMPTY_COLOR,
+                        outline='black',
+                        width=2
+                    )
+
+        for row in range(self.rows):
+            for col in range(self.cols):
+                self.draw_cell(row, col)
+
+    def draw_cell(self, row, col):
+        """Recolor a single cell to match the board"""
+        piece = self.board.board[row][col]
+        if piece == player:
+            color = self.RED
+        elif piece == AI:
+            color = self.YELLOW
+        else:
+            color = self.EMPTY_COLOR
+        self.canvas.itemconfig(self.cell_items[row][col], fill=color)
 
     def on_canvas_click(self, event):
         """Handle click on the board"""
@@ -292,7 +399,7 @@ class Connect4GUI:
             return
 
         col = event.x // self.cell_size
-        if 0 <= col < cols and self.board.is_valid_location(col):
+        if 0 <= col < self.cols and self.board.is_valid_location(col):
             self.make_move(col)
 
     def on_mouse_move(self, event):
@@ -302,52 +409,36 @@ class Connect4GUI:
             return
 
         col = event.x // self.cell_size
-        if 0 <= col < cols and self.board.is_valid_location(col):
+        if 0 <= col < self.cols and self.board.is_valid_location(col):
             self.canvas.config(cursor="hand2")
         else:
             self.canvas.config(cursor="")
 
     def count_fours(self, piece):
         """Count the number of connect-4s for a given piece"""
-        count = 0
-
-        # Horizontal
-        for r in range(rows):
-            for c in range(cols - 3):
-                if all(self.board.board[r][c + i] == piece for i in range(4)):
-                    count += 1
-
-        # Vertical
-        for r in range(rows - 3):
-            for c in range(cols):
-                if all(self.board.board[r + i][c] == piece for i in range(4)):
-                    count += 1
-
-        # Diagonal down-right
-        for r in range(rows - 3):
-            for c in range(cols - 3):
-                if all(self.board.board[r + i][c + i] == piece for i in range(4)):
-                    count += 1
-
-        # Diagonal down-left
-        for r in range(rows - 3):
-            for c in range(3, cols):
-                if all(self.board.board[r + i][c - i] == piece for i in range(4)):
-                    count += 1
-
-        return count
-
-    def update_scores(self):
-        """Update the connect-4 count for both players"""
-        self.player_fours = self.count_fours(player)
-        self.ai_fours = self.count_fours(AI)
+        return self.utils.count_fours(self.board, piece)
+
+    def update_scores(self, row=None, col=None):
+        """
+        Update the connect-4 count for both players.
+        With the cell of the last dropped piece only the windows through it are checked.
+        """
+        if row is None:
+            self.player_fours = self.count_fours(player)
+            self.ai_fours = self.count_fours(AI)
+        else:
+            piece = self.board.board[row][col]
+            new_fours = self.utils.count_fours_through(self.board, row, col, piece)
+            if piece == player:
+                self.player_fours += new_fours
+            else:
+                self.ai_fours += new_fours
         self.score_label.config(text=f"Human: {self.player_fours} | AI: {self.ai_fours}")
 
     def check_game_over(self):
         """Check if game is over and determine winner"""
         if not self.board.get_valid_moves():
             self.game_over = True
-            self.update_scores()
 
             if self.player_fours > self.ai_fours:
                 winner = "Human Wins!"
@@ -366,6 +457,10 @@ class Connect4GUI:
             self.add_terminal_message("GAME OVER!")
             self.add_terminal_message(f"Final Score - Human: {self.player_fours} | AI: {self.ai_fours}")
             self.add_terminal_message(f"Result: {winner}")
+            geometry = "" if (self.rows, self.cols, self.connect) == (rows, cols, connect) else \
+                f" --geometry {self.rows} {self.cols} {self.connect}"
+            self.add_terminal_message("Review the game: python game_analysis.py "
+                                      + "".join(str(col) for col in self.board.move_history) + geometry)
             self.add_terminal_message("=" * 50)
 
             messagebox.showinfo("Game Over",
@@ -376,13 +471,15 @@ class Connect4GUI:
 
     def make_move(self, col):
         """Make a move on the board"""
+        self.stop_pondering()
         self.board.drop_piece(col, self.current_player)
-        self.draw_board()
+        row = self.board.column_heights[col] - 1
+        self.draw_cell(row, col)
 
         player_name = "Human (Red)" if self.current_player == player else "AI (Yellow)"
         self.add_terminal_message(f"{player_name} moved in column {col}")
 
-        self.update_scores()
+        self.update_scores(row, col)
 
         if self.check_game_over():
             return
@@ -394,6 +491,8 @@ class Connect4GUI:
         # Trigger AI move
         if self.current_player == AI and not self.game_over:
             self.root.after(500, self.ai_move)
+        elif self.reuse_search.get():
+            self.start_pondering()
 
     def ai_move(self):
         """Execute AI move with tree visualization"""
@@ -413,32 +512,41 @@ class Connect4GUI:
             self.add_terminal_message(f"⚠️ Depth {depth} may take a long time...")
             self.root.update()
 
+        if self.reuse_search.get() or algo == "mcts":
+            self.engine_ai_move(valid_moves)
+            return
+
         start_time = time.time()
 
         try:
             # Capture tree output
             old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            
+            trace_buffer = TimedStringIO()
+            sys.stdout = trace_buffer
+            stats = SearchStats()
           
             if algo == "minimax":
-                score, col, nodes = minimax_with_tree(self.board, depth, True, self.utils)
+                score, col, nodes = minimax_with_tree(self.board, depth, True, self.utils, stats=stats)
                 self.add_terminal_message(f"Nodes explored: {nodes}")
             elif algo == "alpha_beta":
-                score, col, nodes = alpha_beta_with_tree(self.board, depth, float('-inf'), float('inf'), True, self.utils)
+                score, col, nodes = alpha_beta_with_tree(self.board, depth, float('-inf'), float('inf'), True, self.utils, stats=stats)
                 self.add_terminal_message(f"Nodes explored: {nodes}")
             else:  # expectiminimax
-                score, col , nodes = expecti_with_tree(self.board, depth, True, self.utils)
+                score, col , nodes = expecti_with_tree(self.board, depth, True, self.utils, stats=stats)
                 self.add_terminal_message(f"Nodes explored: {nodes}")
             # Get captured output
-            tree_output = sys.stdout.getvalue()
+            tree_output = trace_buffer.getvalue()
             sys.stdout = old_stdout
             
             # Display tree in terminal
+            display_start = time.time()
             self.add_terminal_message(tree_output)
+            stats.trace_write_time = trace_buffer.write_time + (time.time() - display_start)
             
             end_time = time.time()
             elapsed = end_time - start_time
+            stats.total_time = elapsed
+            self.show_search_stats(stats)
 
             if col is not None and col in valid_moves:
                 self.add_terminal_message(f"\n✅ AI chose column {col} (score: {score:.2f})")
@@ -464,6 +572,70 @@ class Connect4GUI:
             import traceback
             self.add_terminal_message(traceback.format_exc())
 
+    def get_engine(self):
+        """Engine for the current settings; its transposition table survives between moves"""
+        algo = self.selected_algorithm.get()
+        if self.engine is None or self.engine.algorithm != algo:
+            # the old ponderer searches with the old engine: stop it before closing that engine
+            self.stop_pondering()
+            if self.engine is not None:
+                self.engine.close()
+            self.engine = Engine(algo, depth=self.depth.get(), tt_size=1_000_000, eval_cache_size=1 << 18,
+                                 batch_leaves=batch_eval is not None,
+                                 delta_leaves=batch_eval is None)
+            self.ponderer = Ponderer(self.engine)
+        self.engine.depth = self.depth.get()
+        self.engine.movetime = self.mcts_time.get() if algo == "mcts" else None
+        return self.engine
+
+    def engine_ai_move(self, valid_moves):
+        """AI move through the headless engine, reusing earlier and pondered search work"""
+        try:
+            result = self.get_engine().search(self.board, maximizing=True)
+        except Exception as e:
+            self.add_terminal_message(f"ERROR: {str(e)}")
+            import traceback
+            self.add_terminal_message(traceback.format_exc())
+            return
+
+        stats = result.stats
+        self.show_search_stats(stats)
+        if self.engine.algorithm == "mcts":
+            self.add_terminal_message(f"Playouts: {result.nodes} ({int(result.nps)}/s), "
+                                      f"tree depth: {result.depth}, tree size: {len(self.engine.mcts)}")
+        else:
+            self.add_terminal_message(f"Nodes explored: {result.nodes} "
+                                      f"(TT hits: {stats.tt_hits}/{stats.tt_probes}, table size: {len(self.engine.tt)})")
+        if result.move in valid_moves:
+            self.add_terminal_message(f"\n✅ AI chose column {result.move} (score: {result.score:.2f})")
+            self.add_terminal_message(f"⏱️ Time taken: {result.elapsed:.4f} seconds")
+            self.add_terminal_message("")
+            self.make_move(result.move)
+        else:
+            self.add_terminal_message(f"ERROR: AI returned invalid column: {result.move}")
+
+    def start_pondering(self):
+        """Search the human's likely replies in the background while waiting for a click"""
+        if self.game_over or not self.board.get_valid_moves():
+            return
+        if self.get_engine().algorithm == "mcts":
+            return  # its tree is kept between moves, but it does not search on the human's time
+        self.ponderer.start(self.board)
+
+    def stop_pondering(self):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
+    def on_reuse_search_change(self):
+        """Handle the search reuse / pondering toggle"""
+        if self.reuse_search.get():
+            self.add_terminal_message("Search reuse and pondering enabled (tree output off)")
+            if self.game_started and self.current_player == player:
+                self.start_pondering()
+        else:
+            self.stop_pondering()
+            self.add_terminal_message("Search reuse and pondering disabled")
+
     def start_game(self):
         """Start the game"""
         if not self.game_started:
@@ -479,7 +651,10 @@ class Connect4GUI:
 
     def reset_game(self):
         """Reset the game"""
-        self.board = Board()
+        self.stop_pondering()
+        if self.engine is not None:
+            self.engine.new_game()
+        self.board = Board(self.rows, self.cols, self.connect)
         self.game_over = False
         self.current_player = player
         self.game_started = False
@@ -508,26 +683,101 @@ class Connect4GUI:
         algo_names = {
             "minimax": "Minimax (No Pruning)",
             "alpha_beta": "Alpha-Beta Pruning",
-            "expectiminimax": "Expectiminimax"
+            "expectiminimax": "Expectiminimax",
+            "mcts": "Monte Carlo Tree Search"
         }
         algo = self.selected_algorithm.get()
         self.add_terminal_message(f"Algorithm selected: {algo_names[algo]}")
 
+    def toggle_stats_panel(self):
+        """Show or hide the search statistics panel"""
+        self.stats_visible = not self.stats_visible
+        if self.stats_visible:
+            self.stats_toggle.config(text="▼ Search Statistics")
+            self.stats_label.pack(anchor=tk.W, padx=10)
+        else:
+            self.stats_toggle.config(text="▶ Search Statistics")
+            self.stats_label.pack_forget()
+
+    def show_search_stats(self, stats):
+        """Display the profiling counters of the last AI move"""
+        self.stats_label.config(text="\n".join(stats.format_lines()))
+
     def on_depth_change(self):
         """Handle depth change"""
         self.add_terminal_message(f"Depth changed to: {self.depth.get()}")
 
+    def on_save_log_change(self):
+        """Open or close the full terminal log file"""
+        if self.save_log.get():
+            self.terminal_log_file = open(self.terminal_log_path, "a", encoding="utf-8")
+            self.add_terminal_message(f"Saving full log to {self.terminal_log_path}")
+        elif self.terminal_log_file is not None:
+            self.terminal_log_file.close()
+            self.terminal_log_file = None
+
+    def on_close(self):
+        """Window closed: stop the background work and close the terminal log before exiting"""
+        self.stop_pondering()
+        if self.engine is not None:
+            self.engine.close()
+        if self.terminal_log_file is not None:
+            self.terminal_log_file.close()
+            self.terminal_log_file = None
+        self.root.destroy()
+
     def add_terminal_message(self, message):
-        """Add a message to the terminal"""
+        """Add a message to the terminal (capped, large messages inserted in chunks)"""
+        if self.terminal_log_file is not None:
+            self.terminal_log_file.write(message + "\n")
+            self.terminal_log_file.flush()
+
+        lines = message.split("\n")
+
+        # Anything beyond the line cap would be trimmed right away, so only queue the tail
+        if len(lines) > self.terminal_max_lines:
+            omitted = len(lines) - self.terminal_max_lines + 1
+            hint = " (see log file)" if self.terminal_log_file is not None else ""
+            lines = [f"... {omitted} lines omitted{hint} ..."] + lines[-self.terminal_max_lines + 1:]
+
+        for start in range(0, len(lines), self.TERMINAL_CHUNK_LINES):
+            self.terminal_queue.append("\n".join(lines[start:start + self.TERMINAL_CHUNK_LINES]) + "\n")
+
+        # Small messages are shown immediately unless older chunks are still pending
+        if len(self.terminal_queue) == 1 and not self.terminal_drain_scheduled:
+            self.drain_terminal_queue()
+        elif not self.terminal_drain_scheduled:
+            self.terminal_drain_scheduled = True
+            self.root.after(1, self.drain_terminal_queue)
+
+    def drain_terminal_queue(self):
+        """Insert one pending chunk and reschedule if more are waiting"""
+        self.terminal_drain_scheduled = False
+        if not self.terminal_queue:
+            return
+
         self.terminal.config(state=tk.NORMAL)
-        self.terminal.insert(tk.END, message + "\n")
+        self.terminal.insert(tk.END, self.terminal_queue.popleft())
+
+        # Drop the oldest lines once the ring buffer is full
+        line_count = int(self.terminal.index("end-1c").split(".")[0]) - 1
+        if line_count > self.terminal_max_lines:
+            excess = line_count - self.terminal_max_lines
+            self.terminal.delete("1.0", f"{excess + 1}.0")
+
         self.terminal.see(tk.END)
         self.terminal.config(state=tk.DISABLED)
 
+        if self.terminal_queue:
+            self.terminal_drain_scheduled = True
+            self.root.after(1, self.drain_terminal_queue)
+
 
 def main():
+    # optional board geometry: python gui.py [rows cols [connect]]
+    geometry = [int(arg) for arg in sys.argv[1:4]]
     root = tk.Tk()
-    app = Connect4GUI(root)
+    app = Connect4GUI(root, **dict(zip(("rows", "cols", "connect"), geometry)))
     root.mainloop()
 
 
@@ -0,0 +1,465 @@
+"""
+UCT Monte Carlo Tree Search.
+
+Instead of a fixed depth it keeps playing random games to the full board, scored with
+the game's rule (more complete fours wins), and grows a tree towards the moves that
+win most often, so it gets steadily stronger the more time it is given.
+
+The tree lives in flat arrays indexed by node number (children of a node are stored
+contiguously), playouts run on two bitboards, and the subtree under the move actually
+played is kept for the next search. Any board geometry works: the bitboard layout and
+shifts come from the board's Geometry.
+
+ParallelMCTS spreads the work over processes, either as independent trees merged by
+root visit counts ("root") or as one tree whose playouts run in batches ("leaf").
+Given a ChromeTracer it records a span per worker task in the workers and merges them
+into that trace.
+"""
+from array import array
+import math
+import multiprocessing
+import random
+import time
+from geometry import DEFAULT_GEOMETRY
+from tracing import ChromeTracer, NULL_SPAN
+
+EMPTY = 0
+PLAYER = 1
+AI = 2
+
+# Bitboard: bit col * height + row, where height (Geometry.height) is rows + 1: an
+# always-empty sentinel row on top of every column keeps shifted windows from wrapping
+# into the next column. Geometry.shifts holds the shifts of the four directions.
+
+DEFAULT_PLAYOUTS = 10000  # budget when no time limit is given
+CHECK_INTERVAL = 64  # playouts between stop / deadline checks
+REPORT_INTERVAL = 4096  # playouts between progress callbacks
+LEAF_BATCH = 256  # leaves selected per round of leaf-parallel playouts
+
+
+def count_fours(bits, shifts=DEFAULT_GEOMETRY.shifts, connect=DEFAULT_GEOMETRY.connect):
+    """Number of windows of connect cells fully set in a bitboard (same as MinimaxUtils.count_fours)"""
+    total = 0
+    if connect == 4:
+        for shift in shifts:
+            pairs = bits & (bits >> shift)
+            total += (pairs & (pairs >> 2 * shift)).bit_count()
+        return total
+    for shift in shifts:
+        run = bits
+        for i in range(1, connect):
+            run &= bits >> i * shift
+        total += run.bit_count()
+    return total
+
+
+def playout(ai_bits, human_bits, heights, to_move, rand, geometry=DEFAULT_GEOMETRY):
+    """Play random moves until the board is full; 1.0 if the AI has more fours, 0.5 on a tie, else 0.0"""
+    rows, height = geometry.rows, geometry.height
+    open_cols = [col for col in range(geometry.cols) if heights[col] < rows]
+    while open_cols:
+        i = int(rand() * len(open_cols))
+        col = open_cols[i]
+        bit = 1 << (col * height + heights[col])
+        heights[col] += 1
+        if heights[col] == rows:
+            open_cols[i] = open_cols[-1]
+            open_cols.pop()
+        if to_move == AI:
+            ai_bits |= bit
+            to_move = PLAYER
+        else:
+            human_bits |= bit
+            to_move = AI
+    shifts, connect = geometry.shifts, geometry.connect
+    ai_fours, human_fours = count_fours(ai_bits, shifts, connect), count_fours(human_bits, shifts, connect)
+    return 1.0 if ai_fours > human_fours else 0.0 if ai_fours < human_fours else 0.5
+
+
+def to_bitboards(board):
+    """(AI bits, human bits) of a Board"""
+    ai_bits = human_bits = 0
+    height = board.geometry.height
+    for row in range(board.rows):
+        for col in range(board.cols):
+            piece = board.board[row][col]
+            if piece == AI:
+                ai_bits |= 1 << (col * height + row)
+            elif piece == PLAYER:
+                human_bits |= 1 << (col * height + row)
+    return ai_bits, human_bits
+
+
+class MCTS:
+    def __init__(self, exploration=math.sqrt(2), max_nodes=1_000_000, seed=None):
+        self.exploration = exploration
+        self.max_nodes = max_nodes  # the tree stops growing here, playouts continue
+        self.random = random.Random(seed)
+        self.root_history = None  # moves leading to the root of the kept tree
+        self.geometry = DEFAULT_GEOMETRY  # of the boards in the kept tree
+        self._reset()
+
+    def _reset(self):
+        self.parent = array("i", [-1])
+        self.move = array("b", [-1])  # column played into this node
+        self.first_child = array("i", [-1])  # -1 until expanded
+        self.num_children = array("b", [0])
+        self.visits = array("i", [0])
+        self.wins = array("d", [0.0])  # reward for the side that moved into this node
+
+    def __len__(self):
+        return len(self.visits)
+
+    def clear(self):
+        self.root_history = None
+        self._reset()
+
+    def search(self, board, piece, movetime=None, playouts=None, stop_event=None, on_progress=None, tracer=None):
+        """
+        Run playouts from board with piece to move, until movetime (seconds) has passed,
+        `playouts` were run or stop_event is set (DEFAULT_PLAYOUTS without any limit).
+        Returns (move, AI's expected result of the move in [0, 1], playouts, max tree depth).
+        on_progress receives the same tuple every REPORT_INTERVAL playouts. tracer is only
+        used by ParallelMCTS (a single tree has no worker spans to add).
+        """
+        if movetime is None and playouts is None:
+            playouts = DEFAULT_PLAYOUTS
+        deadline = time.perf_counter() + movetime if movetime is not None else None
+        self._reuse_tree(board)
+
+        root = to_bitboards(board) + (list(board.column_heights), piece)
+        rand = self.random.random
+        geometry = self.geometry
+
+        done, max_depth = 0, 0
+        while playouts is None or done < playouts:
+            if done % CHECK_INTERVAL == 0 and done:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if on_progress is not None and done % REPORT_INTERVAL == 0:
+                    on_progress(self._best(piece) + (done, max_depth))
+
+            node, depth, ai_bits, human_bits, heights, to_move = self._descend(root)
+            if depth > max_depth:
+                max_depth = depth
+            self._backpropagate(node, depth, piece, playout(ai_bits, human_bits, heights, to_move, rand, geometry))
+            done += 1
+
+        self.root_history = list(board.move_history)
+        return self._best(piece) + (done, max_depth)
+
+    def search_leaf_parallel(self, board, piece, pool, workers, movetime=None, playouts=None, stop_event=None,
+                             on_progress=None, batch_size=LEAF_BATCH, tracer=None):
+        """
+        Like search(), but selects batch_size leaves at a time and plays them out in the pool.
+        Each selected path gets a virtual loss until its result is back, which steers the
+        following selections of the batch towards other leaves.
+        """
+        if movetime is None and playouts is None:
+            playouts = DEFAULT_PLAYOUTS
+        deadline = time.perf_counter() + movetime if movetime is not None else None
+        self._reuse_tree(board)
+        root = to_bitboards(board) + (list(board.column_heights), piece)
+
+        done, max_depth, reported = 0, 0, 0
+        while playouts is None or done < playouts:
+            if done:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if on_progress is not None and done - reported >= REPORT_INTERVAL:
+                    reported = done
+                    on_progress(self._best(piece) + (done, max_depth))
+
+            size = batch_size if playouts is None else min(batch_size, playouts - done)
+            batch = [self._descend(root, virtual_loss=True) for _ in range(size)]
+            chunk = -(-size // workers)
+            tasks = [([leaf[2:] for leaf in batch[i:i + chunk]], self.random.getrandbits(64), self.geometry,
+                      tracer is not None) for i in range(0, size, chunk)]
+            results = []
+            for chunk_results, events in pool.map(_playout_batch, tasks):
+                results.extend(chunk_results)
+                if events:
+                    tracer.merge(events)
+            for (node, depth, *_), result in zip(batch, results):
+                if depth > max_depth:
+                    max_depth = depth
+                self._backpropagate(node, depth, piece, result, virtual_loss=True)
+            done += size
+
+        self.root_history = list(board.move_history)
+        return self._best(piece) + (done, max_depth)
+
+    def _descend(self, root, virtual_loss=False):
+        """
+        Select a leaf by UCT from root (ai bits, human bits, heights, piece to move), expanding it
+        on its second visit. Returns (node, depth, ai bits, human bits, heights, piece to move).
+        """
+        parent, move, first_child, num_children = self.parent, self.move, self.first_child, self.num_children
+        visits, wins = self.visits, self.wins
+        exploration = self.exploration
+        rows, cols, height = self.geometry.rows, self.geometry.cols, self.geometry.height
+        ai_bits, human_bits, heights, to_move = root
+        heights = heights[:]
+        node, depth = 0, 0
+
+        while first_child[node] >= 0:
+            start = first_child[node]
+            log_visits = math.log(visits[node])
+            best_value, node_next = -1.0, start
+            for child in range(start, start + num_children[node]):
+                child_visits = visits[child]
+                if child_visits == 0:
+                    node_next = child
+                    break
+                value = wins[child] / child_visits + exploration * math.sqrt(log_visits / child_visits)
+                if value > best_value:
+                    best_value, node_next = value, child
+            node = node_next
+            col = move[node]
+            bit = 1 << (col * height + heights[col])
+            heights[col] += 1
+            if to_move == AI:
+                ai_bits |= bit
+            else:
+                human_bits |= bit
+            to_move = PLAYER if to_move == AI else AI
+            depth += 1
+
+        if (visits[node] > 0 or node == 0) and len(visits) < self.max_nodes:
+            start = len(visits)
+            for col in range(cols):
+                if heights[col] < rows:
+                    parent.append(node)
+                    move.append(col)
+                    first_child.append(-1)
+                    num_children.append(0)
+                    visits.append(0)
+                    wins.append(0.0)
+            if len(visits) > start:
+                first_child[node] = start
+                num_children[node] = len(visits) - start
+                node = start
+                col = move[node]
+                bit = 1 << (col * height + heights[col])
+                heights[col] += 1
+                if to_move == AI:
+                    ai_bits |= bit
+                else:
+                    human_bits |= bit
+                to_move = PLAYER if to_move == AI else AI
+                depth += 1
+
+        if virtual_loss:
+            # counted as a visit without a win until the playout result arrives
+            leaf = node
+            while leaf >= 0:
+                visits[leaf] += 1
+                leaf = parent[leaf]
+        return node, depth, ai_bits, human_bits, heights, to_move
+
+    def _backpropagate(self, node, depth, piece, result, virtual_loss=False):
+        """Add a playout result (for the AI) from node up to the root; the root was entered by the opponent"""
+        parent, visits, wins = self.parent, self.visits, self.wins
+        mover = piece if depth % 2 == 1 else (PLAYER if piece == AI else AI)
+        reward = result if mover == AI else 1.0 - result
+        while node >= 0:
+            if not virtual_loss:
+                visits[node] += 1
+            wins[node] += reward
+            reward = 1.0 - reward
+            node = parent[node]
+
+    def root_children(self):
+        """(move, visits, wins for the side to move) of every root child"""
+        start = self.first_child[0]
+        if start < 0:
+            return []
+        return [(self.move[child], self.visits[child], self.wins[child])
+                for child in range(start, start + self.num_children[0])]
+
+    def _best(self, piece):
+        """(most visited root move, AI's expected result of it)"""
+        start = self.first_child[0]
+        if start < 0:
+            return None, 0.5
+        best = start
+        for child in range(start, start + self.num_children[0]):
+            if self.visits[child] > self.visits[best]:
+                best = child
+        if self.visits[best] == 0:
+            return self.move[best], 0.5
+        rate = self.wins[best] / self.visits[best]
+        return self.move[best], rate if piece == AI else 1.0 - rate
+
+    def _reuse_tree(self, board):
+        """Keep the subtree of the new position if it continues the previous root"""
+        history, old = board.move_history, self.root_history
+        if board.geometry.key != self.geometry.key:
+            self.geometry = board.geometry
+            old = None
+        if old is None or len(history) < len(old) or list(history[:len(old)]) != old:
+            self._reset()
+            return
+        node = 0
+        for col in history[len(old):]:
+            start = self.first_child[node]
+            if start < 0:
+                self._reset()
+                return
+            for child in range(start, start + self.num_children[node]):
+                if self.move[child] == col:
+                    node = child
+                    break
+            else:
+                self._reset()
+                return
+        if node != 0:
+            self._extract(node)
+
+    def _extract(self, root):
+        """Make root's subtree the whole tree (breadth first, so children stay contiguous)"""
+        old_move, old_first, old_count = self.move, self.first_child, self.num_children
+        old_visits, old_wins = self.visits, self.wins
+        self._reset()
+        self.visits[0] = old_visits[root]
+        self.wins[0] = old_wins[root]
+        queue = [(root, 0)]  # (old index, new index)
+        for old, new in queue:
+            start = old_first[old]
+            if start < 0:
+                continue
+            self.first_child[new] = len(self.visits)
+            self.num_children[new] = old_count[old]
+            for child in range(start, start + old_count[old]):
+                queue.append((child, len(self.visits)))
+                self.parent.append(new)
+                self.move.append(old_move[child])
+                self.first_child.append(-1)
+                self.num_children.append(0)
+                self.visits.append(old_visits[child])
+                self.wins.append(old_wins[child])
+
+
+# ----------------------------------------------------------------------
+# Process pool workers
+# ----------------------------------------------------------------------
+_worker_tree = None  # root mode: the tree of this worker, kept between searches
+_worker_stop = None  # multiprocessing.Event shared with the parent
+
+
+def _init_worker(stop_flag, root_tree=False):
+    global _worker_stop, _worker_tree
+    _worker_stop = stop_flag
+    if root_tree:
+        _worker_tree = MCTS()
+
+
+def _playout_batch(task):
+    """Play out a chunk of leaves; (results, trace events or None)"""
+    leaves, seed, geometry, trace = task
+    rand = random.Random(seed).random
+    tracer = ChromeTracer() if trace else None
+    with tracer.span("playout batch", "worker", leaves=len(leaves)) if trace else NULL_SPAN:
+        results = [playout(ai_bits, human_bits, heights, to_move, rand, geometry)
+                   for ai_bits, human_bits, heights, to_move in leaves]
+    return results, tracer.events if trace else None
+
+
+def _root_search(task):
+    """Grow this worker's tree; (root children, playouts, max depth, trace events or None)"""
+    board, piece, movetime, playouts, seed, trace, reset = task
+    if reset:
+        _worker_tree.clear()
+    _worker_tree.random.seed(seed)
+    tracer = ChromeTracer() if trace else None
+    with tracer.span("root tree", "worker", tree_nodes=len(_worker_tree)) if trace else NULL_SPAN:
+        _, _, done, max_depth = _worker_tree.search(board, piece, movetime, playouts, _worker_stop)
+    return _worker_tree.root_children(), done, max_depth, tracer.events if trace else None
+
+
+class ParallelMCTS:
+    """
+    MCTS on `workers` processes, with the same search() interface as MCTS.
+    mode "root": every worker grows its own tree from the position and the root moves
+    are chosen by the summed visit counts. mode "leaf": one tree in this process, whose
+    leaves are played out in batches by the workers (with virtual loss).
+    In root mode every tree has a pool of its own single process, so each search continues
+    the same tree (a shared pool may hand two tasks of a search to one process).
+    """
+    def __init__(self, workers, mode="root", batch_size=LEAF_BATCH, seed=None):
+        if mode not in ("root", "leaf"):
+            raise ValueError(f"Unknown parallel MCTS mode: {mode}")
+        self.workers = workers
+        self.mode = mode
+        self.batch_size = batch_size
+        self.tree = MCTS(seed=seed)  # the shared tree in leaf mode, the seed source in root mode
+        self.stop_flag = multiprocessing.Event()
+        self.pool = None  # leaf mode
+        self.tree_pools = None  # root mode: one single-process pool per tree
+        self.reset_trees = False  # clear() was called: the worker trees start over with the next search
+
+    def __len__(self):
+        return len(self.tree)
+
+    def clear(self):
+        self.tree.clear()
+        self.reset_trees = True
+
+    def close(self):
+        for pool in [self.pool] + (self.tree_pools or []):
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self.pool = self.tree_pools = None
+        self.reset_trees = False  # new workers start with new trees
+
+    def _get_pool(self):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker, initargs=(self.stop_flag,))
+        return self.pool
+
+    def _get_tree_pools(self):
+        if self.tree_pools is None:
+            self.tree_pools = [multiprocessing.Pool(1, initializer=_init_worker, initargs=(self.stop_flag, True))
+                               for _ in range(self.workers)]
+        return self.tree_pools
+
+    def search(self, board, piece, movetime=None, playouts=None, stop_event=None, on_progress=None, tracer=None):
+        if self.mode == "leaf":
+            return self.tree.search_leaf_parallel(board, piece, self._get_pool(), self.workers, movetime, playouts,
+                                                  stop_event, on_progress, self.batch_size, tracer)
+
+        if movetime is None and playouts is None:
+            playouts = DEFAULT_PLAYOUTS
+        share = -(-playouts // self.workers) if playouts is not None else None
+        reset, self.reset_trees = self.reset_trees, False
+        pending = [pool.apply_async(_root_search, ((board, piece, movetime, share, self.tree.random.getrandbits(64),
+                                                    tracer is not None, reset),))
+                   for pool in self._get_tree_pools()]
+        for result in pending:
+            while not result.ready():
+                if stop_event is not None and stop_event.is_set():
+                    self.stop_flag.set()
+                result.wait(0.01)
+        self.stop_flag.clear()
+
+        merged, done, max_depth = {}, 0, 0
+        for children, worker_done, worker_depth, events in (result.get() for result in pending):
+            if events:
+                tracer.merge(events)
+            for col, visits, wins in children:
+                total = merged.setdefault(col, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+            done += worker_done
+            max_depth = max(max_depth, worker_depth)
+        if not merged:
+            return None, 0.5, done, max_depth
+        col = max(merged, key=lambda c: merged[c][0])  # first of equally visited moves in column order
+        visits, wins = merged[col]
+        rate = wins / visits if visits else 0.5
+        return col, rate if piece == AI else 1.0 - rate, done, max_depth
@@ -82,7 +82,7 @@ def _minimax_recursive(board, depth, maximizing_player, utils, current_depth):
         
         return min_eval, best_col, node
 
-def minimax_with_tree(board, depth, is_maximizing, utils, indent_level=0, col_played=None):
+def minimax_with_tree(board, depth, is_maximizing, utils, indent_level=0, col_played=None, stats=None):
 
     indent = "  " * indent_level
     
@@ -99,11 +99,14 @@ def minimax_with_tree(board, depth, is_maximizing, utils, indent_level=0, col_pl
     if indent_level <= 6 :  # Only show board for first few levels to avoid clutter
         print_board_state(board, indent + "│  ")
     
+    if stats is not None:
+        stats.record_node(indent_level)
+    
     # Terminal conditions
-    valid_moves = board.get_valid_moves()
+    valid_moves = stats.valid_moves(board) if stats is not None else board.get_valid_moves()
     
     if depth == 0 or not valid_moves:
-        score = utils.evaluate_board(board)
+        score = stats.evaluate(utils, board) if stats is not None else utils.evaluate_board(board)
         print(f"{indent}└─ LEAF: Score = {score:.2f}")
         return score, None, 0
     
@@ -125,7 +128,7 @@ def minimax_with_tree(board, depth, is_maximizing, utils, indent_level=0, col_pl
             
             # Recursive call
             eval_score, _, child_nodes = minimax_with_tree(
-                temp_board, depth - 1, False, utils, indent_level + 1, col
+                temp_board, depth - 1, False, utils, indent_level + 1, col, stats
             )
             nodes_explored += child_nodes
             
@@ -155,7 +158,7 @@ def minimax_with_tree(board, depth, is_maximizing, utils, indent_level=0, col_pl
             
             # Recursive call
             eval_score, _, child_nodes = minimax_with_tree(
-                temp_board, depth - 1, True, utils, indent_level + 1, col
+                temp_board, depth - 1, True, utils, indent_level + 1, col, stats
             )
             nodes_explored += child_nodes
             
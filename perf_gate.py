@@ -0,0 +1,128 @@
+"""
+Performance regression gate.
+
+    python perf_gate.py            # compare against perf_baseline.json, exit 1 on regression
+    python perf_gate.py --update   # re-record the baseline (after an intended change)
+
+Runs the benchmark corpus through the configured runners. Node counts, moves and
+scores are deterministic and must match the baseline exactly, so any change in
+pruning or evaluation behaviour is caught. Total wall time per runner and depth
+may not exceed the baseline by more than the tolerance (plus a small absolute slack).
+"""
+from benchmark import load_corpus, run_benchmark, git_commit
+import argparse
+import json
+import os
+import platform
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+# runner -> depths checked by the gate (kept small enough to run in about a minute)
+DEFAULT_PLAN = {
+    "minimax_with_tree": [1, 2, 3],
+    "alpha_beta_with_tree": [1, 2, 3, 4],
+    "expecti_with_tree": [1, 2, 3],
+    "engine_minimax": [1, 2, 3],
+    "engine_alpha_beta": [1, 2, 3, 4, 5],
+    "engine_expectiminimax": [1, 2, 3],
+    "disk_cache_alpha_beta": [3, 4, 5],
+    "disk_cache_expectiminimax": [3],
+}
+
+
+def run_plan(plan, corpus, repeat):
+    results = []
+    for runner, depths in plan.items():
+        results.extend(run_benchmark([runner], depths, corpus, repeat, measure_memory=False))
+    return results
+
+
+def time_totals(results):
+    totals = {}
+    for r in results:
+        key = f"{r['runner']}@{r['depth']}"
+        totals[key] = totals.get(key, 0.0) + r["wall_time"]
+    return totals
+
+
+def compare(baseline, results, time_tolerance, time_slack=0.05, check_time=True):
+    """Return a list of failure messages (empty when the gate passes)"""
+    failures = []
+    expected = {(r["runner"], r["depth"], r["position"]): r for r in baseline["results"]}
+    for r in results:
+        key = (r["runner"], r["depth"], r["position"])
+        base = expected.get(key)
+        if base is None:
+            failures.append(f"{r['runner']} d={r['depth']} {r['position']}: not in baseline (run --update)")
+            continue
+        for field in ("nodes", "move", "score"):
+            if r[field] != base[field]:
+                failures.append(f"{r['runner']} d={r['depth']} {r['position']}: {field} {r[field]} != baseline {base[field]}")
+
+    if check_time:
+        current = time_totals(results)
+        for key, base_time in baseline["time_totals"].items():
+            # the absolute slack keeps timer noise on very short totals from failing the gate
+            if key in current and current[key] > base_time * (1.0 + time_tolerance) + time_slack:
+                failures.append(f"{key}: {current[key]:.3f}s exceeds baseline {base_time:.3f}s "
+                                f"by more than {time_tolerance:.0%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when node counts change or search time regresses")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="record a new baseline instead of checking")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--time-slack", type=float, default=0.05, help="extra seconds allowed on every total")
+    parser.add_argument("--no-time", action="store_true", help="only check the deterministic counts")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per search, best one is kept")
+    args = parser.parse_args()
+
+    plan = DEFAULT_PLAN
+    if not args.update and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        plan = baseline["plan"]
+    elif not args.update:
+        parser.error(f"no baseline at {args.baseline}, run with --update first")
+
+    corpus = load_corpus()
+    start_time = time.perf_counter()
+    results = run_plan(plan, corpus, args.repeat)
+    print(f"Ran {len(results)} searches in {time.perf_counter() - start_time:.1f}s")
+
+    if args.update:
+        baseline = {
+            "corpus_version": corpus["version"],
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "plan": plan,
+            "results": [{k: r[k] for k in ("runner", "depth", "position", "nodes", "move", "score")}
+                        for r in results],
+            "time_totals": time_totals(results),
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if baseline["corpus_version"] != corpus["version"]:
+        raise SystemExit(f"Corpus version {corpus['version']} != baseline {baseline['corpus_version']}, run --update")
+
+    failures = compare(baseline, results, args.time_tolerance, args.time_slack, not args.no_time)
+    current = time_totals(results)
+    for key, base_time in baseline["time_totals"].items():
+        if key in current:
+            print(f"  {key:28} {current[key]:8.3f}s  (baseline {base_time:8.3f}s, {current[key] / base_time - 1:+.0%})")
+    if failures:
+        print("\nPERFORMANCE GATE FAILED:")
+        for failure in failures:
+            print("  " + failure)
+        raise SystemExit(1)
+    print("\nPerformance gate passed")
+
+
+if __name__ == "__main__":
+    main()
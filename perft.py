@@ -0,0 +1,113 @@
+"""
+Perft: count the leaf positions reachable in exactly `depth` moves.
+
+    python perft.py 6             # perft from the empty board, checked against REFERENCE_COUNTS
+    python perft.py 5 --divide    # per root column
+    python perft.py 4 --moves 3343
+
+Only Board.get_valid_moves, drop_piece and undo_move are exercised, so this measures
+raw move generation / make / unmake speed without evaluation or search, and verifies
+any replacement Board representation. Games only end when the board is full
+(the count-the-fours rule), so connect-4s do not cut the tree.
+"""
+from engine import board_from_moves, PLAYER, AI
+import argparse
+import time
+
+# perft(empty board, depth): 7^depth until a column can overflow at depth 7
+REFERENCE_COUNTS = {
+    0: 1,
+    1: 7,
+    2: 49,
+    3: 343,
+    4: 2401,
+    5: 16807,
+    6: 117649,
+    7: 823536,
+    8: 5764458,
+}
+
+
+def perft(board, depth, piece=None):
+    """Number of move sequences of length `depth` from this position"""
+    if piece is None:
+        piece = AI if len(board.move_history) % 2 == 1 else PLAYER
+    if depth == 0:
+        return 1
+
+    valid_moves = board.get_valid_moves()
+    next_piece = PLAYER if piece == AI else AI
+    count = 0
+    for col in valid_moves:  # no bulk counting at depth 1: every leaf goes through make/unmake
+        board.drop_piece(col, piece)
+        count += perft(board, depth - 1, next_piece)
+        board.undo_move()
+    return count
+
+
+def divide(board, depth):
+    """Perft split by root column: {col: count}"""
+    if depth < 1:
+        raise ValueError("divide needs a depth of at least 1")
+    piece = AI if len(board.move_history) % 2 == 1 else PLAYER
+    next_piece = PLAYER if piece == AI else AI
+    counts = {}
+    for col in board.get_valid_moves():
+        board.drop_piece(col, piece)
+        counts[col] = perft(board, depth - 1, next_piece)
+        board.undo_move()
+    return counts
+
+
+def make_unmake_rate(board, duration=1.0):
+    """drop_piece + undo_move pairs per second over every legal column"""
+    piece = AI if len(board.move_history) % 2 == 1 else PLAYER
+    valid_moves = board.get_valid_moves()
+    pairs = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < duration:
+        for _ in range(1000):
+            for col in valid_moves:
+                board.drop_piece(col, piece)
+                board.undo_move()
+        pairs += 1000 * len(valid_moves)
+    return pairs / (time.perf_counter() - start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count leaf positions through move generation only")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--moves", default="", help="start position as a digit string of columns, human first")
+    parser.add_argument("--divide", action="store_true", help="show the count for each root column")
+    parser.add_argument("--throughput", action="store_true", help="also measure make/unmake pairs per second")
+    args = parser.parse_args()
+    if args.depth < (1 if args.divide else 0):
+        parser.error(f"depth must be at least {1 if args.divide else 0}")
+
+    board = board_from_moves(args.moves)
+    start_time = time.perf_counter()
+    if args.divide:
+        counts = divide(board, args.depth)
+        for col, count in counts.items():
+            print(f"{col}: {count}")
+        total = sum(counts.values())
+    else:
+        total = perft(board, args.depth)
+    elapsed = time.perf_counter() - start_time
+
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"perft({args.depth}) = {total}  ({elapsed:.3f}s, {rate:,.0f} leaves/sec)")
+
+    if not args.moves and args.depth in REFERENCE_COUNTS:
+        expected = REFERENCE_COUNTS[args.depth]
+        status = "OK" if total == expected else f"MISMATCH (expected {expected})"
+        print(f"reference: {status}")
+        if total != expected:
+            raise SystemExit(1)
+
+    if args.throughput:
+        print(f"make/unmake: {make_unmake_rate(board):,.0f} pairs/sec")
+
+
+if __name__ == "__main__":
+    main()
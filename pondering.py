@@ -0,0 +1,65 @@
+from engine import Engine, side_to_move, AI
+import threading
+
+
+class Ponderer:
+    """
+    Thinks on the opponent's time: searches the position after each likely reply
+    (the predicted one first) in a background thread. The searches share the
+    engine's transposition table, so when the opponent plays one of them the
+    engine's real search finds the root already solved, or at least a warm table.
+    """
+    def __init__(self, engine):
+        if engine.tt is None:
+            raise ValueError("Pondering needs an engine with a transposition table")
+        self.engine = engine
+        self.ponder_engine = None
+        self.thread = None
+        self.stopped = False
+        self.stop_event = threading.Event()  # stops the ponder searches, even one not started yet
+        self.replies_done = 0
+
+    def start(self, board, depth=None):
+        """Start pondering on `board`, where the opponent is to move"""
+        self.stop()
+        engine = self.engine
+        # a separate engine so stopping the ponder search never touches the main one
+        self.ponder_engine = Engine(engine.algorithm, depth=engine.depth, evaluation=engine.evaluation,
+                                    utils=engine.utils, tt=engine.tt,
+                                    eval_cache=engine.eval_cache, batch_leaves=engine.batch_leaves,
+                                    delta_leaves=engine.delta_leaves, order_moves=engine.order_moves,
+                                    slip_probabilities=engine.slip_probabilities)
+        self.stopped = False
+        self.stop_event = threading.Event()
+        self.replies_done = 0
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), depth), daemon=True)
+        self.thread.start()
+
+    def _run(self, board, depth):
+        depth = depth if depth is not None else self.engine.depth
+        opponent = side_to_move(board)
+        ai_to_reply = opponent != AI
+
+        # predict the opponent's reply with a shallower search, then try the rest
+        predicted = self.ponder_engine.search(board, depth=max(1, depth - 2), maximizing=not ai_to_reply,
+                                              stop_event=self.stop_event).move
+        replies = [predicted] + [col for col in board.get_valid_moves() if col != predicted]
+
+        for col in replies:
+            if self.stopped:
+                return
+            board.drop_piece(col, opponent)
+            if board.get_valid_moves():
+                self.ponder_engine.search(board, depth=depth, maximizing=ai_to_reply, stop_event=self.stop_event)
+            board.undo_move()
+            if not self.stopped:
+                self.replies_done += 1
+
+    def stop(self):
+        """Stop pondering and wait for the background search to finish"""
+        if self.thread is None:
+            return
+        self.stopped = True
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
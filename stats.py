@@ -0,0 +1,131 @@
+from geometry import DEFAULT_CONNECT
+from io import StringIO
+import time
+
+
+class SearchStats:
+    """Profiling counters filled in by the searches (GUI tree searches and the headless Engine)"""
+    def __init__(self):
+        self.nodes = 0
+        self.eval_calls = 0
+        self.eval_time = 0.0
+        self.eval_cache_hits = 0  # leaf scores served by the EvalCache (not in eval_calls)
+        self.movegen_calls = 0
+        self.cutoffs_by_index = {}  # index of the move that caused the cutoff -> count
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.disk_probes = 0  # persistent cache
+        self.disk_hits = 0
+        self.disk_stores = 0
+        self.max_depth = 0
+        self.nodes_per_depth = {}  # ply below the root -> nodes
+        # time spent writing the tree trace into its buffer and displaying it; building the
+        # trace lines (formatting, board drawing) happens inside the search and is not included
+        self.trace_write_time = 0.0
+        self.total_time = 0.0
+
+    def record_node(self, ply):
+        self.nodes += 1
+        self.nodes_per_depth[ply] = self.nodes_per_depth.get(ply, 0) + 1
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def record_cutoff(self, move_index):
+        self.cutoffs_by_index[move_index] = self.cutoffs_by_index.get(move_index, 0) + 1
+
+    def valid_moves(self, board):
+        self.movegen_calls += 1
+        return board.get_valid_moves()
+
+    def evaluate(self, utils, board):
+        start = time.perf_counter()
+        score = utils.evaluate_board(board)
+        self.eval_time += time.perf_counter() - start
+        self.eval_calls += 1
+        return score
+
+    def evaluate_batch(self, utils, boards, connect=DEFAULT_CONNECT):
+        """Scores (a list) of many boards (of one connect length) evaluated in one vectorised call"""
+        start = time.perf_counter()
+        scores = utils.evaluate_batch(boards, connect).tolist()
+        self.eval_time += time.perf_counter() - start
+        self.eval_calls += len(scores)
+        return scores
+
+    def merge(self, other):
+        """Add another SearchStats (e.g. from a worker) into this one"""
+        self.nodes += other.nodes
+        self.eval_calls += other.eval_calls
+        self.eval_time += other.eval_time
+        self.eval_cache_hits += other.eval_cache_hits
+        self.movegen_calls += other.movegen_calls
+        for index, count in other.cutoffs_by_index.items():
+            self.cutoffs_by_index[index] = self.cutoffs_by_index.get(index, 0) + count
+        self.tt_probes += other.tt_probes
+        self.tt_hits += other.tt_hits
+        self.tt_stores += other.tt_stores
+        self.disk_probes += other.disk_probes
+        self.disk_hits += other.disk_hits
+        self.disk_stores += other.disk_stores
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for ply, count in other.nodes_per_depth.items():
+            self.nodes_per_depth[ply] = self.nodes_per_depth.get(ply, 0) + count
+        self.trace_write_time += other.trace_write_time
+
+    def to_dict(self):
+        return {
+            "nodes": self.nodes,
+            "eval_calls": self.eval_calls,
+            "eval_time": self.eval_time,
+            "eval_cache_hits": self.eval_cache_hits,
+            "movegen_calls": self.movegen_calls,
+            "cutoffs_by_index": dict(sorted(self.cutoffs_by_index.items())),
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_stores": self.tt_stores,
+            "disk_probes": self.disk_probes,
+            "disk_hits": self.disk_hits,
+            "disk_stores": self.disk_stores,
+            "max_depth": self.max_depth,
+            "nodes_per_depth": dict(sorted(self.nodes_per_depth.items())),
+            "trace_write_time": self.trace_write_time,
+            "total_time": self.total_time,
+        }
+
+    def format_lines(self):
+        """Human readable summary for the GUI panel"""
+        lines = [f"Nodes: {self.nodes}  (max depth {self.max_depth})"]
+        share = f" ({100 * self.eval_time / self.total_time:.0f}% of move)" if self.total_time > 0 else ""
+        lines.append(f"Evaluations: {self.eval_calls} in {self.eval_time:.4f}s{share}")
+        if self.eval_cache_hits:
+            leaves = self.eval_calls + self.eval_cache_hits
+            lines.append(f"Eval cache: {self.eval_cache_hits} hits ({100 * self.eval_cache_hits / leaves:.0f}% of leaves)")
+        lines.append(f"Move generations: {self.movegen_calls}")
+        cutoffs = sum(self.cutoffs_by_index.values())
+        if cutoffs:
+            by_index = ", ".join(f"#{i}: {c}" for i, c in sorted(self.cutoffs_by_index.items()))
+            first = 100 * self.cutoffs_by_index.get(0, 0) / cutoffs
+            lines.append(f"Cutoffs: {cutoffs} ({first:.0f}% on first move) {by_index}")
+        else:
+            lines.append("Cutoffs: 0")
+        hit_rate = f" ({100 * self.tt_hits / self.tt_probes:.0f}%)" if self.tt_probes else ""
+        lines.append(f"TT: {self.tt_probes} probes, {self.tt_hits} hits{hit_rate}, {self.tt_stores} stores")
+        if self.disk_probes or self.disk_stores:
+            lines.append(f"Disk cache: {self.disk_probes} probes, {self.disk_hits} hits, {self.disk_stores} stores")
+        lines.append("Nodes per depth: " + ", ".join(f"{d}: {n}" for d, n in sorted(self.nodes_per_depth.items())))
+        lines.append(f"Trace writes + display: {self.trace_write_time:.4f}s")
+        return lines
+
+
+class TimedStringIO(StringIO):
+    """StringIO that accumulates the time spent in write() (not in formatting what is written), for tree traces"""
+    def __init__(self):
+        super().__init__()
+        self.write_time = 0.0
+
+    def write(self, s):
+        start = time.perf_counter()
+        n = super().write(s)
+        self.write_time += time.perf_counter() - start
+        return n
@@ -0,0 +1,220 @@
+"""
+Self-play tournament between engine configurations.
+
+    python tournament.py -c alpha_beta:depth=4 -c minimax:depth=3 -c expectiminimax:depth=3,eval=windows_only \
+        --games 1000 --workers 8 --out results.jsonl
+
+A configuration is `algorithm[:key=value,...]` with keys depth, movetime (seconds), eval
+and playouts (mcts without a movetime), e.g. mcts:movetime=0.5.
+Every pair of configurations plays the requested number of games with colours
+alternated over the same random openings. A game is played until the board is full
+and won by whoever has more connect-4s, exactly like Connect4GUI.check_game_over.
+"""
+from engine import Engine, ALGORITHMS, EVALUATORS, PLAYER, AI, board_from_moves, side_to_move
+from MinimaxUtils import MinimaxUtils
+from itertools import combinations
+from multiprocessing import Pool
+import argparse
+import json
+import math
+import os
+import random
+import time
+
+
+def parse_config(spec):
+    """'alpha_beta:depth=4,eval=default' -> config dict"""
+    algorithm, _, params = spec.partition(":")
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm in {spec!r}")
+    config = {"name": spec, "algorithm": algorithm, "depth": 4, "movetime": None, "eval": "default",
+              "playouts": None}
+    for item in filter(None, params.split(",")):
+        key, _, value = item.partition("=")
+        if key == "depth":
+            config["depth"] = int(value)
+        elif key == "movetime":
+            config["movetime"] = float(value)
+        elif key == "playouts":
+            config["playouts"] = int(value)
+        elif key == "eval":
+            if value not in EVALUATORS:
+                raise ValueError(f"Unknown evaluation in {spec!r}")
+            config["eval"] = value
+        else:
+            raise ValueError(f"Unknown option {key!r} in {spec!r}")
+    return config
+
+
+def make_engine(config):
+    return Engine(config["algorithm"], depth=config["depth"], movetime=config["movetime"],
+                  evaluation=config["eval"], playouts=config["playouts"])
+
+
+def random_opening(rng, plies):
+    board = board_from_moves([])
+    moves = []
+    piece = PLAYER
+    for _ in range(plies):
+        col = rng.choice(board.get_valid_moves())
+        board.drop_piece(col, piece)
+        moves.append(col)
+        piece = AI if piece == PLAYER else PLAYER
+    return moves
+
+
+def play_game(task):
+    """Play one game in a worker process and return its record"""
+    engines = {PLAYER: make_engine(task["first"]), AI: make_engine(task["second"])}
+    utils = MinimaxUtils()
+    board = board_from_moves(task["opening"])
+    nodes = {PLAYER: 0, AI: 0}
+    think_time = {PLAYER: 0.0, AI: 0.0}
+    searched_moves = 0
+
+    start_time = time.perf_counter()
+    while board.get_valid_moves():
+        piece = side_to_move(board)
+        result = engines[piece].search(board, maximizing=(piece == AI))
+        nodes[piece] += result.nodes
+        think_time[piece] += result.elapsed
+        searched_moves += 1
+        board.drop_piece(result.move, piece)
+    wall_time = time.perf_counter() - start_time
+
+    first_fours = utils.count_fours(board, PLAYER)
+    second_fours = utils.count_fours(board, AI)
+    if first_fours > second_fours:
+        first_score = 1.0
+    elif first_fours < second_fours:
+        first_score = 0.0
+    else:
+        first_score = 0.5
+
+    return {
+        "game": task["game"],
+        "first": task["first"]["name"],
+        "second": task["second"]["name"],
+        "opening": task["opening"],
+        "moves": board.move_history,
+        "first_fours": first_fours,
+        "second_fours": second_fours,
+        "first_score": first_score,
+        "nodes": nodes[PLAYER] + nodes[AI],
+        "first_nodes": nodes[PLAYER],
+        "second_nodes": nodes[AI],
+        "first_time": think_time[PLAYER],
+        "second_time": think_time[AI],
+        "searched_moves": searched_moves,
+        "wall_time": wall_time,
+        "worker": os.getpid(),
+    }
+
+
+def build_schedule(configs, games_per_pair, opening_plies, seed):
+    """Pair every two configurations, each opening played once with each colour"""
+    tasks = []
+    rng = random.Random(seed)
+    game = 0
+    for a, b in combinations(configs, 2):
+        for i in range(games_per_pair):
+            if i % 2 == 0:
+                opening = random_opening(rng, opening_plies)
+            first, second = (a, b) if i % 2 == 0 else (b, a)
+            tasks.append({"game": game, "first": first, "second": second, "opening": opening})
+            game += 1
+    return tasks
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def elo_estimate(scores, z=1.96):
+    """Elo difference implied by a list of per-game scores (1 / 0.5 / 0) with a confidence interval"""
+    n = len(scores)
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / (n - 1) if n > 1 else 0.25
+    error = math.sqrt(variance / n)
+    return elo_from_score(mean), elo_from_score(mean - z * error), elo_from_score(mean + z * error)
+
+
+def summarize(records, configs):
+    """Return printable report lines: pairwise and vs-field Elo, throughput per worker"""
+    lines = []
+    names = [c["name"] for c in configs]
+    pair_scores = {}
+    field_scores = {name: [] for name in names}
+    for r in records:
+        pair_scores.setdefault((r["first"], r["second"]), []).append(r["first_score"])
+        field_scores[r["first"]].append(r["first_score"])
+        field_scores[r["second"]].append(1.0 - r["first_score"])
+
+    lines.append("Pairwise results (Elo of A relative to B, 95% CI):")
+    for a, b in combinations(names, 2):
+        scores = pair_scores.get((a, b), []) + [1.0 - s for s in pair_scores.get((b, a), [])]
+        if not scores:
+            continue
+        elo, low, high = elo_estimate(scores)
+        lines.append(f"  {a} vs {b}: {len(scores)} games, score {sum(scores) / len(scores):.3f}, "
+                     f"Elo {elo:+.0f} [{low:+.0f}, {high:+.0f}]")
+
+    lines.append("Performance against the field:")
+    for name in names:
+        scores = field_scores[name]
+        if not scores:
+            continue
+        elo, low, high = elo_estimate(scores)
+        lines.append(f"  {name}: {len(scores)} games, Elo {elo:+.0f} [{low:+.0f}, {high:+.0f}]")
+
+    lines.append("Throughput per worker:")
+    workers = {}
+    for r in records:
+        w = workers.setdefault(r["worker"], {"games": 0, "nodes": 0, "think": 0.0, "moves": 0, "wall": 0.0})
+        w["games"] += 1
+        w["nodes"] += r["nodes"]
+        w["think"] += r["first_time"] + r["second_time"]
+        w["moves"] += r["searched_moves"]
+        w["wall"] += r["wall_time"]
+    for pid, w in sorted(workers.items()):
+        nps = w["nodes"] / w["think"] if w["think"] > 0 else 0.0
+        mps = w["moves"] / w["wall"] if w["wall"] > 0 else 0.0
+        lines.append(f"  worker {pid}: {w['games']} games, {nps:,.0f} nodes/sec, {mps:.2f} moves/sec")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel self-play tournament between engine configurations")
+    parser.add_argument("-c", "--config", action="append", required=True,
+                        help="algorithm[:depth=N,movetime=S,eval=NAME], give at least two")
+    parser.add_argument("--games", type=int, default=100, help="games per pair of configurations")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--opening-plies", type=int, default=2, help="random moves played before the engines take over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="tournament.jsonl", help="JSONL file the game records are streamed to")
+    args = parser.parse_args()
+
+    configs = [parse_config(spec) for spec in args.config]
+    if len(configs) < 2:
+        parser.error("need at least two configurations")
+
+    tasks = build_schedule(configs, args.games, args.opening_plies, args.seed)
+    records = []
+    start_time = time.perf_counter()
+    with open(args.out, "w") as out, Pool(args.workers) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            records.append(record)
+            print(f"[{len(records)}/{len(tasks)}] {record['first']} vs {record['second']}: "
+                  f"{record['first_fours']}-{record['second_fours']}")
+    elapsed = time.perf_counter() - start_time
+
+    print(f"\n{len(records)} games in {elapsed:.1f}s ({len(records) / elapsed:.2f} games/sec)")
+    for line in summarize(records, configs):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Chrome Trace Event export (open the JSON in chrome://tracing or ui.perfetto.dev).
+
+Spans are stored as complete ("X") events with microsecond timestamps from the
+monotonic clock, which is shared between processes, so events recorded in worker
+processes can be merged into the parent's trace.
+"""
+import json
+import os
+import threading
+import time
+
+
+def now_us():
+    return time.perf_counter_ns() // 1000
+
+
+class TraceSpan:
+    """Context manager returned by ChromeTracer.span"""
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.complete(self.name, self.cat, self.start, now_us() - self.start, self.args)
+        return False
+
+
+class NullSpan:
+    """Span that records nothing (sampled out or tracing disabled)"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class ChromeTracer:
+    """
+    Collects trace events for one AI move.
+    `sample_every` maps a category to N: only every Nth span of that category is kept
+    (e.g. per-leaf evaluations). Once `max_events` is reached further spans of the sampled
+    categories are dropped and counted, so the file size stays bounded however deep the
+    search goes; the structural spans (search, iterations, root moves) are always kept,
+    evicting sampled spans to make room.
+    """
+    def __init__(self, max_events=200000, sample_every=None):
+        self.max_events = max_events
+        self.sample_every = {"eval": 64}
+        if sample_every:
+            self.sample_every.update(sample_every)
+        self.seen = {}  # category -> spans requested
+        self.dropped = 0
+        self.structural = []  # events of the unsampled categories
+        self.sampled = []  # events of the sampled categories, evicted first
+        self.pid = os.getpid()
+
+    def span(self, name, cat, **args):
+        every = self.sample_every.get(cat)
+        if every is not None:
+            seen = self.seen.get(cat, 0) + 1
+            self.seen[cat] = seen
+            if seen % every:
+                return NULL_SPAN
+        return TraceSpan(self, name, cat, args)
+
+    @property
+    def events(self):
+        return self.structural + self.sampled
+
+    def complete(self, name, cat, start, duration, args=None, pid=None, tid=None):
+        if cat in self.sample_every and len(self.structural) + len(self.sampled) >= self.max_events:
+            self.dropped += 1
+            return
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": start,
+            "dur": duration,
+            "pid": pid if pid is not None else self.pid,
+            "tid": tid if tid is not None else threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        self._add(event)
+
+    def merge(self, events):
+        """Add events recorded by another tracer (typically in a worker process)"""
+        for event in events:
+            self._add(event)
+
+    def _add(self, event):
+        if event["cat"] in self.sample_every:
+            if len(self.structural) + len(self.sampled) >= self.max_events:
+                self.dropped += 1
+            else:
+                self.sampled.append(event)
+            return
+        if len(self.structural) + len(self.sampled) >= self.max_events and self.sampled:
+            self.sampled.pop()
+            self.dropped += 1
+        self.structural.append(event)
+
+    def to_json(self):
+        events = self.events
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"search {pid}"}}
+                    for pid in sorted({e["pid"] for e in events})]
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "dropped_events": self.dropped,
+                "sampled_categories": {cat: f"1/{n}" for cat, n in self.sample_every.items()},
+            },
+        }
+
+    def save(self, path, exclusive=False):
+        """Write the trace JSON; exclusive raises FileExistsError instead of replacing a file"""
+        with open(path, "x" if exclusive else "w") as f:
+            json.dump(self.to_json(), f)
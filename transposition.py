@@ -0,0 +1,40 @@
+"""
+Transposition table shared by the Engine searches.
+
+Entries are only used at exactly the depth they were searched to, so a search with
+the table returns the same move and score as one without it; the table just skips
+subtrees that were already searched (by a transposition, an earlier move or pondering).
+"""
+
+EXACT = 0
+LOWER = 1  # score is a lower bound (search failed high)
+UPPER = 2  # score is an upper bound (search failed low)
+
+MAXIMIZING_KEY = 0x9E3779B97F4A7C15  # mixed into the key when the side to move is the maximizer
+
+
+class TranspositionTable:
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.entries = {}  # (key, depth) -> (score, flag, best_col), insertion ordered for eviction
+        self.owner = None  # (algorithm, evaluation, slip model, board geometry, chance samples) of the entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+
+    @staticmethod
+    def key(board, maximizing):
+        return board.hash ^ MAXIMIZING_KEY if maximizing else board.hash
+
+    def probe(self, key, depth):
+        """(score, flag, best_col) stored at exactly this depth, or None"""
+        return self.entries.get((key, depth))
+
+    def store(self, key, depth, score, flag, best_col):
+        entries = self.entries
+        if len(entries) >= self.max_entries and (key, depth) not in entries:
+            del entries[next(iter(entries))]  # evict the oldest entry
+        entries[(key, depth)] = (score, flag, best_col)